@@ -1,8 +1,12 @@
+import multiprocessing
+
 from ImageProcessor import ImageProcessor
 from ImageProcessorGUI import ImageProcessorGUI
 import tkinter as tk
 
 if __name__ == "__main__":
+    # Tiled detection uses a process pool; needed for frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = ImageProcessorGUI(root)
     root.mainloop()
\ No newline at end of file
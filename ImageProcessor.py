@@ -6,12 +6,9 @@ from astropy.stats import mad_std
 from astropy.modeling import models
 from astropy.table import Table
 from astropy.wcs import WCS
-from astropy.stats import SigmaClip
-from photutils.background import Background2D, SExtractorBackground, MedianBackground
+from photutils.background import SExtractorBackground
 from photutils.aperture import CircularAperture
-from photutils.detection import DAOStarFinder
 import matplotlib.pyplot as plt
-import cv2
 from matplotlib.colors import Normalize
 import math
 from PIL import Image
@@ -20,10 +17,55 @@ from processors.TiffProcessor import TiffProcessor
 from processors.JpgProcessor import JpgProcessor
 from processors.FitsProcessor import FitsProcessor
 from spikes.SpikeRenderer import SpikeRenderer
+from detection.StarCatalog import StarCatalog
+from detection.StarCatalogCache import StarCatalogCache
+from detection.BackgroundCache import BackgroundCache
+from detection.DaoStarDetector import DaoStarDetector
+from detection.FastStarDetector import FastStarDetector
+from detection.TiledStarDetector import TiledStarDetector
+from util.DebugLog import DebugLog
+from util.ImageDigest import ImageDigest
+from util.ImageStore import ImageStore
+from util.PercentileStretch import PercentileStretch
+from util.SpatialGrid import SpatialGrid
 from SaveImage import SaveImage
 
 
 class ImageProcessor:
+    # Raw detection catalogs shared by every processor in the session
+    # (star count, process and save all detect on the same pixels)
+    _catalog_cache = StarCatalogCache()
+
+    # Background2D maps per image, reused by every detection on those pixels
+    _background_cache = BackgroundCache()
+
+    # Decoded files and the display/detection arrays derived from them,
+    # shared with the GUI preview, star count and save paths
+    _image_store = ImageStore.shared()
+
+    # Catalogs are detected once at this min_threshold and cut for higher
+    # ones. It is also the lowest min_threshold detection uses: lower values
+    # (the slider goes to 0, and the GUI sets min_threshold directly when
+    # reprocessing) are clamped to it, as __init__ does.
+    DETECTION_FLOOR_THRESHOLD = 1
+
+    # Also run a fresh detection on every call and report the drift;
+    # sources closer than VALIDATE_TOLERANCE pixels count as the same star
+    VALIDATE_DETECTION = False
+    VALIDATE_TOLERANCE = 0.5
+
+    # Detection engines, selectable per call (detect_stars(detector=...)):
+    # "photutils" for final renders, "fast" for star counts and previews
+    DETECTORS = {
+        DaoStarDetector.name: DaoStarDetector(),
+        FastStarDetector.name: FastStarDetector(),
+    }
+    DEFAULT_DETECTOR = DaoStarDetector.name
+
+    # Frames at least this large are detected tile by tile on a process pool
+    TILED_DETECTION_MIN_PIXELS = 64_000_000
+    _tiled_detector = TiledStarDetector()
+
     def __init__(
         self,
         input_image,
@@ -52,6 +94,16 @@ class ImageProcessor:
 
         self.bit_depth_mode = None
 
+        # Optional cap on rendered stars (brightest N); None renders all
+        self.max_stars = None
+        self.render_stats = None
+
+        # Last validate_detection() result (VALIDATE_DETECTION mode)
+        self.detection_drift = None
+
+        # Detection engine for this processor (key of DETECTORS)
+        self.detector = self.DEFAULT_DETECTOR
+
         # FIT save mode: 'scientific' (mono, preserves data) or 'rgb' (3-plane cube)
         self.fit_save_mode = "scientific"
 
@@ -68,7 +120,6 @@ class ImageProcessor:
 
     def process(self):
         import numpy as np
-        import cv2
 
         input_path = self.input_image.strip().lower()
 
@@ -78,8 +129,7 @@ class ImageProcessor:
         try:
             # --- PNG processor ---
             if input_path.endswith(".png"):
-                png_processor = PngProcessor(self.input_image)
-                data = png_processor.load()
+                data = self._load_with(PngProcessor)
                 image_data = data["image_disp"]
                 detection_data = data["detection_data"]
                 original_color = data["original_color"]
@@ -89,8 +139,7 @@ class ImageProcessor:
                 self.bit_depth_mode = "low"
 
             elif input_path.endswith((".fit", ".fits")):
-                fits_processor = FitsProcessor(self.input_image)
-                data = fits_processor.load()
+                data = self._load_with(FitsProcessor)
 
                 image_data = data["image_disp"]
                 detection_data = data["detection_data"]
@@ -107,8 +156,7 @@ class ImageProcessor:
                 # Non-FITS path (robust TIFF/PNG/JPG handling)
                 try:
                     if input_path.endswith((".tif", ".tiff")):
-                        tiff_processor = TiffProcessor(self.input_image)
-                        data = tiff_processor.load()
+                        data = self._load_with(TiffProcessor)
 
                         image_data = data["image_disp"]
                         detection_data = data["detection_data"]
@@ -126,8 +174,7 @@ class ImageProcessor:
                         else:
                             self.bit_depth_mode = "low"
                     else:
-                        jpg_processor = JpgProcessor(self.input_image)
-                        data = jpg_processor.load()
+                        data = self._load_with(JpgProcessor)
 
                         image_data = data["image_disp"]
                         detection_data = data["detection_data"]
@@ -189,13 +236,15 @@ class ImageProcessor:
             if sources is not None and len(sources) > 0:
                 # Prepare image for renderer (same as before)
                 if "original_color" in locals() and original_color is not None:
-                    image_disp = original_color.copy()
+                    image_disp = original_color
                 elif image_data.ndim == 3:
                     image_disp = np.transpose(image_data, (1, 2, 0))
                 else:
-                    image_disp = image_data.copy()
+                    image_disp = image_data
 
-                image_disp = np.clip(image_disp, 0, 255).astype(np.uint8)
+                # np.clip returns a new array, so the loaded (shared,
+                # read-only) image is never modified
+                image_disp = np.clip(image_disp, 0, 255).astype(np.uint8, copy=False)
 
                 # Build params from GUI-controlled values
                 params = {
@@ -207,6 +256,7 @@ class ImageProcessor:
                     "blur_multiplier": self.blur_multiplier,
                     "rotation_angle": self.rotation_angle,
                     "bit_depth_mode": self.bit_depth_mode,
+                    "max_stars": self.max_stars,
                 }
 
                 renderer = SpikeRenderer(params)
@@ -216,6 +266,7 @@ class ImageProcessor:
                     sources=sources,
                     input_path=input_path,
                 )
+                self.render_stats = renderer.last_render_stats
 
                 return self.processed_image
 
@@ -243,9 +294,10 @@ class ImageProcessor:
 
         # Normalize safely for display (no blowout)
         img = image.astype(np.float32)
-        img = img - np.percentile(img, 1)
-        img = img / (np.percentile(img, 99) + 1e-6)
-        img = np.clip(img, 0, 1)
+        p_low, p_high = PercentileStretch.percentiles(image, 1, 99, dtype=np.float32)
+        img -= p_low
+        img /= p_high - p_low + 1e-6
+        np.clip(img, 0, 1, out=img)
 
         plt.figure(figsize=(12, 12))
         plt.imshow(img, interpolation="nearest")
@@ -255,7 +307,93 @@ class ImageProcessor:
         ax.set_axis_off()
         plt.show()
 
-    def detect_stars(self, image_data):
+    def _load_with(self, processor_class):
+        """
+        ProcessorResult of processor_class for the input file, reused from
+        the image store while the file is unchanged (arrays are read-only).
+        """
+        return self._image_store.get(
+            self.input_image,
+            "processor:" + processor_class.__name__,
+            lambda path: processor_class(path).load(),
+        )
+
+    def detect_stars(self, image_data, detector=None):
+        """
+        Detect stars with the named engine (see DETECTORS; defaults to
+        self.detector).
+        """
+        detector = self.DETECTORS[detector or self.detector]
+        image_data = self._detection_plane(image_data)
+        digest = ImageDigest.of(image_data)
+
+        # Detect once at the threshold floor; higher min_threshold values
+        # are answered by filtering on the significance column
+        floor = self.DETECTION_FLOOR_THRESHOLD
+        catalog = self._catalog_cache.get_or_detect(
+            image_data,
+            {"min_threshold": floor, "detector": detector.name},
+            lambda: self._find_sources(image_data, floor, detector, digest),
+            digest=digest,
+        )
+        DebugLog.log("CATALOG CACHE:", self._catalog_cache.stats())
+        DebugLog.log("BACKGROUND CACHE:", self._background_cache.stats())
+
+        sources = self._filter_sources(self._apply_threshold(catalog))
+
+        if self.VALIDATE_DETECTION:
+            self.detection_drift = self.validate_detection(
+                image_data, sources, detector.name
+            )
+            DebugLog.log("DETECTION DRIFT:", self.detection_drift)
+
+        return sources
+
+    def validate_detection(self, image_data, sources=None, detector=None):
+        """
+        Compare the incremental (floor catalog + filter) result against a
+        fresh detection at min_threshold. Sources are matched one to one
+        by nearest neighbour within VALIDATE_TOLERANCE pixels; returns the
+        matched and unmatched counts and the largest matched offset.
+        """
+        image_data = self._detection_plane(image_data)
+        if sources is None:
+            sources = self.detect_stars(image_data, detector)
+
+        fresh = self._filter_sources(
+            self._apply_threshold(
+                self._find_sources(
+                    image_data,
+                    self._detection_threshold(),
+                    self.DETECTORS[detector or self.detector],
+                )
+            )
+        )
+
+        def xy(catalog):
+            if catalog is None or len(catalog) == 0:
+                return np.empty((0, 2))
+            return np.column_stack([catalog["xcentroid"], catalog["ycentroid"]])
+
+        ours, theirs = xy(sources), xy(fresh)
+        _, _, offsets = SpatialGrid.match(
+            ours[:, 0], ours[:, 1], theirs[:, 0], theirs[:, 1], self.VALIDATE_TOLERANCE
+        )
+        common = len(offsets)
+        return {
+            "incremental": len(ours),
+            "fresh": len(theirs),
+            "matched": common,
+            "only_incremental": len(ours) - common,
+            "only_fresh": len(theirs) - common,
+            "max_offset": float(offsets.max()) if common else 0.0,
+        }
+
+    @staticmethod
+    def _detection_plane(image_data):
+        """
+        Reduce the input to the 2D float32 plane detection runs on.
+        """
         if image_data.ndim == 3:
             # FIT cubes may be CHW; display images may be HWC. Handle both safely.
             if image_data.shape[0] in (3, 4) and image_data.shape[-1] not in (3, 4):
@@ -265,40 +403,69 @@ class ImageProcessor:
             else:
                 image_data = np.squeeze(image_data)
 
-        image_data = image_data.astype(np.float32)
+        return image_data.astype(np.float32, copy=False)
+
+    def _find_sources(self, image_data, min_threshold, detector, digest=None):
+        """
+        Background-subtract, high-pass and run the detector engine (raw
+        StarCatalog).
+
+        The catalog carries a "significance" column (see
+        StarDetectorInterface) and records min_threshold in its meta so it
+        can be cut for higher thresholds. Very large frames are detected
+        tile by tile.
+        """
+        if image_data.size >= self.TILED_DETECTION_MIN_PIXELS:
+            return StarCatalog.from_table(
+                self._tiled_detector.detect(
+                    image_data, min_threshold, detector, self._background_cache
+                )
+            )
 
-        # Proceed as 2D detection
-        sigma_clip = SigmaClip(sigma=3.0)
+        # Proceed as 2D detection (sigma-clipped 50x50 Background2D, cached)
+        background, background_rms = self._background_cache.get(image_data, digest)
 
-        bkg_estimator = MedianBackground()
+        image_sub = detector.highpass(image_data, background)
+        threshold = detector.threshold(background_rms, min_threshold)
 
-        bkg = Background2D(
-            image_data,
-            (50, 50),
-            filter_size=(3, 3),
-            sigma_clip=sigma_clip,
-            bkg_estimator=bkg_estimator,
-        )
+        sources = StarCatalog.from_table(detector.find(image_sub, threshold))
+        if sources is not None:
+            sources.meta["min_threshold"] = min_threshold
+
+        return sources
 
-        # Subtract background
-        image_sub = image_data - bkg.background
+    def _detection_threshold(self):
+        """
+        self.min_threshold, clamped to DETECTION_FLOOR_THRESHOLD.
+        """
+        return max(self.DETECTION_FLOOR_THRESHOLD, self.min_threshold)
 
-        # High-pass filter to suppress nebula (reduced strength to preserve threshold response)
-        blur = cv2.GaussianBlur(image_sub, (15, 15), 0)
-        image_sub = image_sub - (0.7 * blur)
+    def _apply_threshold(self, catalog):
+        """
+        Cut a catalog detected at a lower min_threshold down to the sources
+        the detector would report at self.min_threshold (a new catalog).
+        """
+        if catalog is None:
+            return None
 
-        # Directly map UI slider to detection threshold (more responsive)
-        base_rms = np.median(bkg.background_rms)
+        ratio = self._detection_threshold() / catalog.meta["min_threshold"]
+        sources = catalog[catalog["significance"] > ratio]
+        if len(sources) == 0:
+            return None
 
-        # Restore stronger sensitivity range for UI control
-        threshold = base_rms * (self.min_threshold / 3.0)
+        if ratio != 1:
+            sources["significance"] = sources["significance"] / ratio
+            if catalog.meta["flux_scales_with_threshold"]:
+                sources["flux"] = sources["flux"] / ratio
 
-        # Define an upper flux cap from max_threshold slider (prevents overly bright regions)
-        max_flux_limit = None
+        return sources
 
-        daofind = DAOStarFinder(fwhm=5.0, threshold=threshold)
-        sources_combined = daofind(image_sub)
+    def _filter_sources(self, sources_combined):
+        """
+        Sharpness cut and max_threshold flux-percentile filter.
 
+        Always returns a new catalog; the cached catalog is left untouched.
+        """
         if sources_combined is not None:
             sources_combined = sources_combined[sources_combined["sharpness"] > 0.25]
 
@@ -1,21 +1,23 @@
-# NOTE: requires `tifffile` for full TIFF compatibility
+# NOTE: requires `tifffile` for full TIFF compatibility (see ImageStore)
 def _load_image_any_format(path):
     from PIL import Image
     import numpy as np
     import cv2
+    from util.ImageStore import ImageStore
+
+    # Decodes are shared with the processor and save paths
+    store = ImageStore.shared()
 
     # Try PIL first
     try:
-        return Image.open(path)
+        return store.read_pil(path)
     except Exception:
         pass
 
     # If TIFF, go straight to tifffile (avoid OpenCV header errors)
     if path.lower().endswith((".tif", ".tiff")):
         try:
-            import tifffile as tiff
-
-            data = tiff.imread(path)
+            data = store.read_tiff(path)
 
             # Normalize to 8-bit for display (handle float/uint32 safely)
             data = data.astype(np.float32)
@@ -37,8 +39,9 @@ def _load_image_any_format(path):
             raise RuntimeError(f"Unsupported TIFF format: {path} ({e})")
 
     # Non-TIFF: try OpenCV
-    img_cv = cv2.imread(path, cv2.IMREAD_UNCHANGED)
-    if img_cv is None:
+    try:
+        img_cv = store.read_cv2(path)
+    except ValueError:
         raise RuntimeError(f"Unsupported image format: {path}")
 
     # Normalize to 8-bit for display
@@ -57,7 +60,6 @@ from tkinter import filedialog
 from PIL import Image, ImageTk
 import subprocess
 from ImageProcessor import ImageProcessor
-from astropy.io import fits
 from astropy.visualization import simple_norm
 import matplotlib.pyplot as plt
 import cv2
@@ -66,6 +68,9 @@ import io
 import threading
 
 from util.resource_path import resource_path
+from util.LatestTaskWorker import LatestTaskWorker
+from util.ImageStore import ImageStore
+from util.PreviewDecoder import PreviewDecoder
 
 
 class ImageProcessorGUI:
@@ -110,7 +115,14 @@ class ImageProcessorGUI:
 
         # debounce handle for slider updates
         self._star_count_job = None
-        self._star_count_thread = None
+        # Set while the star count that ends an image load is outstanding
+        self._star_count_ends_load = False
+
+        # Background star counting: newest request wins, results are posted
+        # back to the Tk thread
+        self._star_count_worker = LatestTaskWorker(
+            lambda callback: self.root.after(0, callback), name="StarCount"
+        )
 
         # Placeholder images for previews
         self.input_image_preview = ImageTk.PhotoImage(
@@ -746,6 +758,7 @@ class ImageProcessorGUI:
             return
 
         # Start loading animation (force immediate visible text)
+        self._star_count_ends_load = False
         self._load_dots = 1
         self.load_status_var.set("Loading")
         self.root.update_idletasks()
@@ -773,10 +786,15 @@ class ImageProcessorGUI:
         import numpy as np
         import cv2
 
+        # Reduced-resolution decode where the format allows it; the full
+        # frame is decoded in the background by the star count
+        img = PreviewDecoder.decode(file_path, width=600)
+        if img is not None:
+            return self.scale_image(img, width=600)
+
         # FITS path
         if file_path.lower().endswith((".fit", ".fits")):
-            with fits.open(file_path) as hdul:
-                image_data = hdul[0].data
+            image_data, _ = ImageStore.shared().read_fits(file_path)
 
             # Normalize for display
             if image_data.dtype != np.uint8:
@@ -893,64 +911,18 @@ class ImageProcessorGUI:
             print(f"Reset processed preview error: {e}")
 
         # Keep the loading indicator alive until star counting completes
-        threading.Thread(target=self._update_star_count_worker, daemon=True).start()
-
-    def _update_star_count_worker(self):
-        try:
-            input_image = self.input_image_var.get()
-            if not input_image:
-                self.root.after(
-                    0, lambda: self._finish_loading_with_star_count("Stars detected: -")
-                )
-                return
-
-            processor = ImageProcessor(
-                input_image,
-                None,
-                self.min_threshold_var.get(),
-                self.max_threshold_var.get(),
-                1.0,
-                1.0,
-                3,
-                0.1,
-                0,
-            )
-
-            # FITS path
-            if input_image.lower().endswith((".fit", ".fits")):
-                with fits.open(input_image) as hdul:
-                    image_data = hdul[0].data
-            else:
-                # Use robust loader (handles PixInsight TIFF)
-                pil_img = _load_image_any_format(input_image)
-                image_data = np.array(pil_img)
-                if image_data.ndim == 3:
-                    image_data = np.mean(image_data, axis=2)
-
-            sources = processor.detect_stars(image_data)
-
-            try:
-                count = len(sources) if sources is not None else 0
-            except Exception:
-                count = 0
-
-            self.root.after(
-                0,
-                lambda: self._finish_loading_with_star_count(
-                    f"Stars detected: {count}"
-                ),
-            )
-
-        except Exception as e:
-            print(f"[StarCount ERROR] {e}")
-            self.root.after(
-                0,
-                lambda: self._finish_loading_with_star_count("Stars detected: error"),
-            )
+        self._star_count_ends_load = True
+        self.update_star_count()
 
     def _finish_loading_with_star_count(self, text):
         self.star_count_var.set(text)
-        self.stop_loading()
+
+        # Only the count that completes an image load (or a newer one that
+        # superseded it) ends the loading indicator; slider recounts just
+        # update the label
+        if self._star_count_ends_load:
+            self._star_count_ends_load = False
+            self.stop_loading()
 
     def schedule_star_count(self, event=None):
         # cancel any pending job
@@ -961,50 +933,71 @@ class ImageProcessorGUI:
         self._star_count_job = self.root.after(150, self.update_star_count)
 
     def update_star_count(self, event=None):
-        try:
-            input_image = self.input_image_var.get()
-            if not input_image:
-                return
+        input_image = self.input_image_var.get()
+        if not input_image:
+            self._star_count_worker.cancel()
+            self._finish_loading_with_star_count("Stars detected: -")
+            return
 
-            # Lightweight detection only
-            processor = ImageProcessor(
-                input_image,
-                None,
-                self.min_threshold_var.get(),
-                self.max_threshold_var.get(),
-                1.0,  # dummy
-                1.0,  # dummy
-                3,  # dummy
-                0.1,  # dummy
-                0,  # dummy
-            )
+        # Lightweight detection only; slider values are read here, on the
+        # Tk thread, and the worker only sees this snapshot
+        processor = ImageProcessor(
+            input_image,
+            None,
+            self.min_threshold_var.get(),
+            self.max_threshold_var.get(),
+            1.0,  # dummy
+            1.0,  # dummy
+            3,  # dummy
+            0.1,  # dummy
+            0,  # dummy
+        )
 
+        def count_stars(token):
+            image_data = self._star_count_image(input_image)
+            token.check()
+
+            # Star counts use the fast engine; renders keep photutils
+            sources = processor.detect_stars(image_data, detector="fast")
+            return len(sources) if sources is not None else 0
+
+        def done(count, error):
+            if error is not None:
+                print(f"[StarCount ERROR] {error}")
+                self._finish_loading_with_star_count("Stars detected: error")
+            else:
+                self._finish_loading_with_star_count(f"Stars detected: {count}")
+
+        # Supersedes any running or queued count; only the newest one
+        # reaches the UI
+        self._star_count_worker.submit(count_stars, done)
+
+    def _star_count_image(self, input_image):
+        """
+        Detection plane of input_image, derived once per file version and
+        reused by every later star count (see ImageStore).
+        """
+
+        if input_image.lower().endswith((".fit", ".fits")):
+            image_data, _ = ImageStore.shared().read_fits(input_image)
+            if image_data.ndim == 2:
+                # Already the float32 science plane; no second copy
+                return image_data
+
+        def load(path):
             # Load image directly (avoid relying on processor internals)
-            if input_image.lower().endswith((".fit", ".fits")):
-                with fits.open(input_image) as hdul:
-                    image_data = hdul[0].data
+            if path.lower().endswith((".fit", ".fits")):
+                image_data, _ = ImageStore.shared().read_fits(path)
             else:
-                pil_img = _load_image_any_format(input_image)
+                # Use robust loader (handles PixInsight TIFF)
+                pil_img = _load_image_any_format(path)
                 image_data = np.array(pil_img)
                 if image_data.ndim == 3:
                     image_data = np.mean(image_data, axis=2)
 
-            # Run detection only
-            sources = processor.detect_stars(image_data)
-
-            if sources is None:
-                count = 0
-            else:
-                try:
-                    count = len(sources)
-                except Exception:
-                    count = 0
-
-            self.star_count_var.set(f"Stars detected: {count}")
+            return ImageProcessor._detection_plane(image_data)
 
-        except Exception as e:
-            print(f"[StarCount ERROR] {e}")
-            self.star_count_var.set("Stars detected: error")
+        return ImageStore.shared().get(input_image, "star_count_plane", load)
 
     def process_image(self):
         # Start animation
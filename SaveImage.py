@@ -12,6 +12,7 @@ from save_files.SaveTIFF import SaveTIFF
 from save_files.SaveJPG import SaveJPG
 from save_files.SavePNG import SavePNG
 from util.ImageTypeUtil import ImageTypeUtil
+from util.PercentileStretch import PercentileStretch
 from spikes.SpikeRenderer import SpikeRenderer
 
 SPIKE_INTENSITY = 0.5
@@ -27,9 +28,10 @@ class SaveImage:
             image = np.transpose(image, (1, 2, 0))
 
         img = image.astype(np.float32)
-        img = img - np.percentile(img, 1)
-        img = img / (np.percentile(img, 99) + 1e-6)
-        img = np.clip(img, 0, 1)
+        p_low, p_high = PercentileStretch.percentiles(image, 1, 99, dtype=np.float32)
+        img -= p_low
+        img /= p_high - p_low + 1e-6
+        np.clip(img, 0, 1, out=img)
 
         plt.figure(figsize=(12, 12))
         plt.imshow(img, interpolation="nearest")
@@ -134,6 +136,7 @@ class SaveImage:
             "blur_kernel_size": processor.blur_kernel_size,
             "blur_multiplier": processor.blur_multiplier,
             "rotation_angle": processor.rotation_angle,
+            "max_stars": processor.max_stars,
         }
 
         renderer = SpikeRenderer(params)
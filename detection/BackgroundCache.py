@@ -0,0 +1,124 @@
+from astropy.stats import SigmaClip
+from photutils.background import Background2D, MedianBackground
+
+from util.DiskCache import DiskCache
+from util.ImageDigest import ImageDigest
+from util.LRUCache import LRUCache
+
+
+class BackgroundCache:
+    """
+    Session-scoped cache of Background2D results per image.
+
+    Sigma-clipped Background2D over 50x50 boxes is the slowest step of
+    detection. The background map and RMS map are computed once per image
+    content (ImageDigest) and reused by every later detection on the same
+    pixels. Hit/miss counts are available from stats().
+
+    With the disk cache enabled (see DiskCache), maps are also persisted
+    and reloaded across sessions.
+
+    Tiled detection computes maps in worker processes; it looks them up
+    per tile with lookup() and hands new ones back with store().
+    """
+
+    DISK_NAMESPACE = "backgrounds"
+
+    BOX_SIZE = (50, 50)
+    FILTER_SIZE = (3, 3)
+
+    def __init__(self, max_entries=64, max_bytes=512 * 1024 * 1024):
+        self._cache = LRUCache(
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            sizeof=lambda maps: maps[0].nbytes + maps[1].nbytes,
+        )
+
+    def get(self, image, digest=None):
+        """
+        Return (background, background_rms) maps for a 2D image.
+        """
+        if digest is None:
+            digest = ImageDigest.of(image)
+        return self._cache.get_or_create(
+            digest, lambda: self._load_or_estimate(image, digest)
+        )
+
+    def lookup(self, digest):
+        """
+        Cached (background, background_rms) maps for an image digest, from
+        memory or the disk cache, or None. Never estimates.
+        """
+        maps = self._cache.get(digest)
+        if maps is None:
+            maps = self._load(digest)
+            if maps is not None:
+                self._cache.put(digest, maps)
+        return maps
+
+    def store(self, digest, maps):
+        """
+        Keep maps computed elsewhere (e.g. in a worker process).
+        """
+        for array in maps:
+            array.setflags(write=False)
+        self._save(digest, maps)
+        self._cache.put(digest, maps)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def clear(self):
+        self._cache.clear()
+
+    def _load_or_estimate(self, image, digest):
+        maps = self._load(digest)
+        if maps is None:
+            maps = self._estimate(image)
+            self._save(digest, maps)
+        return maps
+
+    def _load(self, digest):
+        disk = DiskCache.shared()
+        if disk is None:
+            return None
+
+        entry = disk.get(self.DISK_NAMESPACE, self._disk_key(digest))
+        if entry is None:
+            return None
+        maps, _ = entry
+        background = maps["background"]
+        background_rms = maps["background_rms"]
+        background.setflags(write=False)
+        background_rms.setflags(write=False)
+        return background, background_rms
+
+    def _save(self, digest, maps):
+        disk = DiskCache.shared()
+        if disk is None:
+            return
+
+        background, background_rms = maps
+        disk.put(
+            self.DISK_NAMESPACE,
+            self._disk_key(digest),
+            {"background": background, "background_rms": background_rms},
+        )
+
+    def _disk_key(self, digest):
+        return DiskCache.key(digest, self.BOX_SIZE, self.FILTER_SIZE)
+
+    @classmethod
+    def _estimate(cls, image):
+        bkg = Background2D(
+            image,
+            cls.BOX_SIZE,
+            filter_size=cls.FILTER_SIZE,
+            sigma_clip=SigmaClip(sigma=3.0),
+            bkg_estimator=MedianBackground(),
+        )
+        background = bkg.background
+        background_rms = bkg.background_rms
+        background.setflags(write=False)
+        background_rms.setflags(write=False)
+        return background, background_rms
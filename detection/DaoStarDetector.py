@@ -0,0 +1,32 @@
+import numpy as np
+from photutils.detection import DAOStarFinder
+
+from detection.StarDetectorInterface import StarDetectorInterface
+
+
+class DaoStarDetector(StarDetectorInterface):
+    """
+    photutils DAOStarFinder engine (precise; used for final renders).
+    """
+
+    name = "photutils"
+
+    def find(self, image_sub, threshold):
+        """
+        Run DAOStarFinder at threshold.
+
+        photutils >= 2 reports the significance ratio as daofind_mag and a
+        threshold-independent flux; older versions fold it into flux/mag,
+        flagged by meta["flux_scales_with_threshold"] so flux can be
+        rescaled when the catalog is cut.
+        """
+        daofind = DAOStarFinder(fwhm=self.FWHM, threshold=threshold)
+        sources = daofind(image_sub)
+
+        if sources is not None:
+            legacy = "daofind_mag" not in sources.colnames
+            mag = sources["mag"] if legacy else sources["daofind_mag"]
+            sources["significance"] = 10.0 ** (-0.4 * np.asarray(mag))
+            sources.meta["flux_scales_with_threshold"] = legacy
+
+        return sources
@@ -0,0 +1,108 @@
+import math
+
+import cv2
+import numpy as np
+from astropy.table import QTable
+
+from detection.StarDetectorInterface import StarDetectorInterface
+
+
+class FastStarDetector(StarDetectorInterface):
+    """
+    OpenCV/NumPy engine for interactive star counts and previews.
+
+    Uses the same zero-sum Gaussian (DAOFIND) kernel and threshold scaling
+    as DAOStarFinder, so star counts track the photutils engine, but
+    replaces its per-source catalog machinery with:
+    - cv2.filter2D for the convolution
+    - local maxima over a min-separation disk (cv2.dilate)
+    Centroids are first moments of the (positive) convolved image over
+    the kernel footprint, not DAOFIND's marginal Gaussian fits; expect
+    sub-pixel differences. They do not depend on the threshold, so a
+    catalog cut to a higher threshold keeps the same positions.
+    """
+
+    name = "fast"
+
+    SIGMA_RADIUS = 1.5
+    SHARPNESS_RANGE = (0.2, 1.0)  # DAOStarFinder defaults
+
+    def __init__(self):
+        self.kernel, self.mask, self.rel_err = self._daofind_kernel(
+            self.FWHM, self.SIGMA_RADIUS
+        )
+        self.min_separation = 2.5 * self.FWHM
+
+    def find(self, image_sub, threshold):
+        image_sub = np.ascontiguousarray(image_sub, dtype=np.float32)
+        convolved = cv2.filter2D(
+            image_sub, -1, self.kernel, borderType=cv2.BORDER_CONSTANT
+        )
+        threshold_eff = threshold * self.rel_err
+
+        above = convolved > threshold_eff
+        r_sep = int(self.min_separation)
+        footprint = cv2.getStructuringElement(
+            cv2.MORPH_ELLIPSE, (2 * r_sep + 1, 2 * r_sep + 1)
+        )
+        peaks = above & (convolved == cv2.dilate(convolved, footprint))
+        py, px = np.nonzero(peaks)
+        if len(px) == 0:
+            return None
+
+        # (N, k, k) windows around every peak
+        r = self.kernel.shape[0] // 2
+        dy, dx = np.mgrid[-r : r + 1, -r : r + 1]
+        rows = py[:, None, None] + dy + r
+        cols = px[:, None, None] + dx + r
+        data = np.pad(image_sub, r)[rows, cols]
+        conv = np.pad(convolved, r)[rows, cols]
+
+        mask = self.mask.astype(bool)
+        n_pixels = mask.sum()
+
+        peak = image_sub[py, px]
+        conv_peak = convolved[py, px]
+        flux = np.sum(data * mask, axis=(1, 2))
+        sharpness = (peak - (flux - peak) / (n_pixels - 1)) / conv_peak
+
+        weights = np.where(mask, np.maximum(conv, 0), 0)
+        total = weights.sum(axis=(1, 2))
+        xcentroid = px + np.sum(weights * dx, axis=(1, 2)) / total
+        ycentroid = py + np.sum(weights * dy, axis=(1, 2)) / total
+
+        lo, hi = self.SHARPNESS_RANGE
+        good = (sharpness > lo) & (sharpness < hi)
+        if not np.any(good):
+            return None
+
+        sources = QTable()
+        sources["id"] = np.arange(1, int(good.sum()) + 1)
+        sources["xcentroid"] = xcentroid[good]
+        sources["ycentroid"] = ycentroid[good]
+        sources["sharpness"] = sharpness[good]
+        sources["peak"] = peak[good]
+        sources["flux"] = flux[good]
+        sources["significance"] = conv_peak[good] / threshold_eff
+        sources.meta["flux_scales_with_threshold"] = False
+        return sources
+
+    @staticmethod
+    def _daofind_kernel(fwhm, sigma_radius):
+        """
+        Circular DAOFIND kernel: zero-sum, variance-normalized Gaussian
+        inside its footprint. Returns (kernel, mask, rel_err).
+        """
+        sigma = fwhm / (2.0 * math.sqrt(2.0 * math.log(2.0)))
+        f = sigma_radius**2 / 2.0
+        radius = int(max(2, math.sqrt(f * 2.0 * sigma**2)))
+
+        yy, xx = np.mgrid[-radius : radius + 1, -radius : radius + 1]
+        elliptical = (xx**2 + yy**2) / (2.0 * sigma**2)
+        mask = ((elliptical <= f) | (np.hypot(xx, yy) <= 2.0)).astype(np.float32)
+        n_pixels = mask.sum()
+
+        gaussian = np.exp(-elliptical) * mask
+        denom = (gaussian**2).sum() - gaussian.sum() ** 2 / n_pixels
+        kernel = ((gaussian - gaussian.sum() / n_pixels) / denom) * mask
+        return kernel.astype(np.float32), mask, 1.0 / math.sqrt(denom)
@@ -0,0 +1,145 @@
+import numpy as np
+from astropy.table import QTable
+
+
+class StarCatalog:
+    """
+    Compact struct-of-arrays star catalog.
+
+    Each column is a contiguous NumPy array. Row selection (a boolean mask
+    or index array, as with astropy tables) does not copy column data: the
+    new catalog shares the parent's arrays through an index array, and a
+    column is only gathered when it is read. Replacing a column
+    (catalog["flux"] = ...) only affects that catalog, so selections of a
+    shared (cached) catalog can be modified freely.
+
+    Detection engines still return astropy tables; from_table() and
+    to_table() convert at the edges. photutils >= 3 centroid columns
+    (x_centroid / y_centroid) are stored as xcentroid / ycentroid.
+    """
+
+    __slots__ = ("_columns", "_length", "meta")
+
+    # photutils >= 3 name -> catalog name
+    COLUMN_ALIASES = {"x_centroid": "xcentroid", "y_centroid": "ycentroid"}
+
+    def __init__(self, columns, meta=None):
+        """
+        columns: mapping of name -> 1D array-like, all the same length.
+        """
+        self._columns = {}
+        self._length = None
+        self.meta = dict(meta or {})
+        for name, values in columns.items():
+            self[name] = values
+        if self._length is None:
+            self._length = 0
+
+    @classmethod
+    def from_table(cls, table):
+        """
+        Catalog from an astropy Table/QTable (None stays None).
+        """
+        if table is None:
+            return None
+        if isinstance(table, StarCatalog):
+            return table
+
+        columns = {}
+        for name in table.colnames:
+            values = np.asarray(getattr(table[name], "value", table[name]))
+            columns[cls.COLUMN_ALIASES.get(name, name)] = values
+        return cls(columns, table.meta)
+
+    def to_table(self):
+        """
+        Copy into an astropy QTable (for photutils / astropy consumers).
+        """
+        return QTable(
+            [self[name] for name in self.colnames],
+            names=self.colnames,
+            meta=dict(self.meta),
+        )
+
+    @property
+    def colnames(self):
+        return list(self._columns)
+
+    @property
+    def nbytes(self):
+        """
+        Bytes held by this catalog's arrays (shared arrays counted once).
+        """
+        arrays = {}
+        for base, index in self._columns.values():
+            arrays[id(base)] = base.nbytes
+            if index is not None:
+                arrays[id(index)] = index.nbytes
+        return sum(arrays.values())
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, name):
+        return name in self._columns
+
+    def __getitem__(self, key):
+        """
+        catalog["name"] -> column array; catalog[mask or indices] -> the
+        selected rows as a new catalog sharing this one's arrays.
+        """
+        if isinstance(key, str):
+            base, index = self._columns[key]
+            return base if index is None else base[index]
+        return self.select(key)
+
+    def __setitem__(self, name, values):
+        values = np.ascontiguousarray(values)
+        if values.ndim != 1:
+            raise ValueError(f"Column '{name}' must be 1D, got shape {values.shape}")
+        if self._length is not None and len(values) != self._length:
+            raise ValueError(
+                f"Column '{name}' has {len(values)} rows, catalog has {self._length}"
+            )
+        self._length = len(values)
+        self._columns[name] = (values, None)
+
+    def select(self, rows):
+        """
+        New catalog with the given rows (boolean mask or integer indices
+        relative to this catalog). Column data is shared, not copied.
+        """
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            if len(rows) != self._length:
+                raise ValueError(
+                    f"Mask has {len(rows)} rows, catalog has {self._length}"
+                )
+            rows = np.flatnonzero(rows)
+        else:
+            rows = rows.astype(np.intp, copy=False)
+
+        # Columns that share an index keep sharing the composed one
+        composed = {}
+        columns = {}
+        for name, (base, index) in self._columns.items():
+            key = id(index)
+            if key not in composed:
+                composed[key] = rows if index is None else index[rows]
+            columns[name] = (base, composed[key])
+
+        catalog = StarCatalog.__new__(StarCatalog)
+        catalog._columns = columns
+        catalog._length = len(rows)
+        catalog.meta = dict(self.meta)
+        return catalog
+
+    def compact(self):
+        """
+        Copy of this catalog with every column gathered into its own
+        contiguous array (releases the parent's arrays).
+        """
+        return StarCatalog({name: self[name] for name in self.colnames}, self.meta)
+
+    def __repr__(self):
+        return f"<StarCatalog {self._length} rows: {', '.join(self.colnames)}>"
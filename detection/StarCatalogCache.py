@@ -0,0 +1,73 @@
+from detection.StarCatalog import StarCatalog
+from util.DiskCache import DiskCache
+from util.ImageDigest import ImageDigest
+from util.LRUCache import LRUCache
+
+
+class StarCatalogCache:
+    """
+    Session-scoped cache of raw star detection catalogs.
+
+    Entries are keyed by image content (ImageDigest) plus the detection
+    parameters that change the raw catalog. Cheap post-filters (sharpness
+    cut, flux percentile from max_threshold) are not part of the key; they
+    are applied to the cached catalog on every call.
+
+    With the disk cache enabled (see DiskCache), memory misses are looked
+    up on disk before detecting, and new catalogs are written there, so
+    they survive restarts.
+    """
+
+    DISK_NAMESPACE = "catalogs"
+
+    def __init__(self, max_entries=8):
+        self._cache = LRUCache(max_entries=max_entries, sizeof=self._catalog_bytes)
+
+    def get_or_detect(self, image, params: dict, detect, digest=None):
+        """
+        Return the catalog for image/params, running detect() on a miss.
+
+        digest may pass a precomputed ImageDigest of image. The returned
+        StarCatalog is shared: select rows into a new catalog, never modify
+        it in place.
+        """
+        if digest is None:
+            digest = ImageDigest.of(image)
+        key = (digest, tuple(sorted(params.items())))
+        return self._cache.get_or_create(key, lambda: self._load_or_detect(key, detect))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def clear(self):
+        self._cache.clear()
+
+    def _load_or_detect(self, key, detect):
+        disk = DiskCache.shared()
+        if disk is None:
+            return detect()
+
+        disk_key = DiskCache.key(*key)
+        entry = disk.get(self.DISK_NAMESPACE, disk_key)
+        if entry is not None:
+            columns, meta = entry
+            # Detections with no sources are cached too
+            return None if meta.pop("empty", False) else StarCatalog(columns, meta)
+
+        catalog = detect()
+        if catalog is None:
+            disk.put(self.DISK_NAMESPACE, disk_key, {}, {"empty": True})
+        else:
+            disk.put(
+                self.DISK_NAMESPACE,
+                disk_key,
+                {name: catalog[name] for name in catalog.colnames},
+                catalog.meta,
+            )
+        return catalog
+
+    @staticmethod
+    def _catalog_bytes(catalog):
+        if catalog is None:
+            return 0
+        return catalog.nbytes
@@ -0,0 +1,65 @@
+from abc import ABC, abstractmethod
+from typing import Any
+
+import cv2
+import numpy as np
+
+
+class StarDetectorInterface(ABC):
+    """
+    Contract for star detection engines.
+
+    Engines receive the background-subtracted, high-passed frame
+    (highpass()) and a DAOStarFinder-style threshold (threshold()), and
+    return a catalog table with at least:
+    - xcentroid, ycentroid, flux, sharpness
+    - significance: detection peak / effective threshold (> 1)
+    and meta["flux_scales_with_threshold"]. ImageProcessor applies the
+    sharpness cut, threshold cuts and flux-percentile filter the same way
+    for every engine.
+    """
+
+    # Name used to select the engine (ImageProcessor.DETECTORS)
+    name = None
+
+    FWHM = 5.0
+
+    # High-pass filter to suppress nebula (reduced strength to preserve
+    # threshold response)
+    HIGHPASS_KERNEL = (15, 15)
+    HIGHPASS_STRENGTH = 0.7
+
+    @abstractmethod
+    def find(self, image_sub: np.ndarray, threshold: float) -> Any:
+        """
+        Args:
+            image_sub: background-subtracted, high-passed 2D frame
+            threshold: detection threshold (see threshold())
+
+        Returns:
+            catalog table, or None when nothing was found
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def highpass(cls, image, background):
+        image_sub = image - background
+        blur = cv2.GaussianBlur(image_sub, cls.HIGHPASS_KERNEL, 0)
+        return image_sub - (cls.HIGHPASS_STRENGTH * blur)
+
+    @staticmethod
+    def threshold(background_rms, min_threshold):
+        """
+        Map the UI min_threshold to a detection threshold.
+        """
+        base_rms = np.median(background_rms)
+        return base_rms * (min_threshold / 3.0)
+
+    @staticmethod
+    def centroid_columns(sources):
+        """
+        (x, y) centroid column names (x_centroid in photutils >= 3).
+        """
+        if "x_centroid" in sources.colnames:
+            return "x_centroid", "y_centroid"
+        return "xcentroid", "ycentroid"
@@ -0,0 +1,316 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from astropy.table import vstack
+
+from detection.BackgroundCache import BackgroundCache
+from detection.StarDetectorInterface import StarDetectorInterface
+from util.ImageDigest import ImageDigest
+from util.SpatialGrid import SpatialGrid
+
+
+def _detect_tile(
+    detector, tile, core, min_threshold, threshold=None, maps=None, return_maps=False
+):
+    """
+    Process-pool worker: Background2D (unless cached maps are passed),
+    high-pass and the detector engine on one tile (core plus overlap).
+
+    Without an explicit threshold the tile is searched below the level its
+    own background RMS implies (LOCAL_THRESHOLD_FACTOR), so the catalog can
+    later be cut to the frame-wide threshold. Returns the sources whose
+    centroid falls in the core (tile coordinates), a strided sample of the
+    core RMS map, the threshold used and, with return_maps, the background
+    maps it estimated (else None).
+    """
+    estimated = maps is None
+    if estimated:
+        maps = BackgroundCache._estimate(tile)
+    background, background_rms = maps
+    image_sub = detector.highpass(tile, background)
+
+    cx0, cy0, cx1, cy1 = core
+    rms_core = background_rms[cy0:cy1, cx0:cx1]
+    if threshold is None:
+        threshold = (
+            detector.threshold(rms_core, min_threshold)
+            * TiledStarDetector.LOCAL_THRESHOLD_FACTOR
+        )
+
+    sources = detector.find(image_sub, threshold)
+    if sources is not None:
+        # Pixel i covers [i - 0.5, i + 0.5); the slack lets both neighbours
+        # claim a border star, the merge keeps one of them
+        slack = TiledStarDetector.OWNERSHIP_SLACK
+        xcol, ycol = StarDetectorInterface.centroid_columns(sources)
+        x = np.asarray(sources[xcol])
+        y = np.asarray(sources[ycol])
+        owned = (
+            (x >= cx0 - 0.5 - slack)
+            & (x < cx1 - 0.5 + slack)
+            & (y >= cy0 - 0.5 - slack)
+            & (y < cy1 - 0.5 + slack)
+        )
+        sources = sources[owned]
+
+    s = TiledStarDetector.RMS_SAMPLE_STRIDE
+    rms_sample = np.array(rms_core[::s, ::s], dtype=np.float32)
+    return sources, rms_sample, threshold, maps if estimated and return_maps else None
+
+
+class TiledStarDetector:
+    """
+    Star detection over overlapping tiles on a process pool.
+
+    Each tile runs its own Background2D and detector engine, so memory is
+    bounded by the tile size instead of the frame. Tile origins and the
+    overlap are multiples of the 50 px background box, so background
+    meshes line up with the single-pass grid; the overlap covers the 3x3
+    mesh filter, the 15x15 high-pass and the detection kernel.
+
+    The frame-wide threshold needs the median RMS of the whole frame, which
+    is only known once every tile is done. Tiles therefore detect below
+    their local threshold and the merged catalog is cut on significance,
+    like ImageProcessor._apply_threshold. Tiles whose search level ended
+    up above the frame-wide threshold are re-run at it. Duplicates from
+    the overlap are removed with a SpatialGrid.
+
+    With a BackgroundCache, tile maps are looked up by tile content before
+    any tile runs and maps estimated by the workers are stored back, so a
+    later detection on the same frame (e.g. with another engine) skips
+    Background2D for every tile still cached.
+
+    The result has the same columns and meta as the single-pass catalog;
+    the flux-percentile filter still runs on the merged catalog.
+    """
+
+    TILE_SIZE = 2000
+    OVERLAP = 100
+
+    # Tiles search at this fraction of their local threshold
+    LOCAL_THRESHOLD_FACTOR = 0.5
+
+    OWNERSHIP_SLACK = 1.0
+    DEDUPE_RADIUS = 1.5  # pixels
+
+    RMS_SAMPLE_STRIDE = 4
+
+    # Workers start as fresh interpreters: detection is started from GUI
+    # worker threads, and forking a threaded process can deadlock the
+    # child. Starting them is slow (each imports the app), so the pool is
+    # kept for the session.
+    START_METHOD = "spawn"
+
+    def __init__(self, workers=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = max(1, int(workers))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def tiles(self, height, width):
+        """
+        Yield (core, bounds) per tile: core (x0, y0, x1, y1) in frame
+        coordinates and bounds including the overlap.
+        """
+        t, o = self.TILE_SIZE, self.OVERLAP
+        for y0 in range(0, height, t):
+            for x0 in range(0, width, t):
+                x1 = min(x0 + t, width)
+                y1 = min(y0 + t, height)
+                yield (x0, y0, x1, y1), (
+                    max(0, x0 - o),
+                    max(0, y0 - o),
+                    min(width, x1 + o),
+                    min(height, y1 + o),
+                )
+
+    def detect(self, image, min_threshold, detector, backgrounds=None):
+        """
+        Detect stars in image with the given StarDetectorInterface engine,
+        reusing tile background maps from backgrounds (a BackgroundCache)
+        when given.
+        """
+        h, w = image.shape
+        specs = []
+        for (x0, y0, x1, y1), (bx0, by0, bx1, by1) in self.tiles(h, w):
+            core = (x0 - bx0, y0 - by0, x1 - bx0, y1 - by0)
+            specs.append(((bx0, by0, bx1, by1), core))
+
+        # All lookups happen before any new maps are stored, so a cache too
+        # small for every tile still serves the tiles it holds
+        digests = [None] * len(specs)
+        if backgrounds is not None:
+            digests = [
+                ImageDigest.of(image[by0:by1, bx0:bx1])
+                for (bx0, by0, bx1, by1), _ in specs
+            ]
+
+        pool = self._pool(len(specs))
+        results = self._run(
+            pool, detector, image, specs, min_threshold, backgrounds, digests
+        )
+
+        global_threshold = StarDetectorInterface.threshold(
+            np.concatenate([rms.ravel() for _, rms, _ in results]), min_threshold
+        )
+
+        # Tiles whose search level was above the frame-wide threshold are
+        # re-run at it, on the pool as well
+        rerun = [
+            i
+            for i, (_, _, threshold) in enumerate(results)
+            if threshold > global_threshold
+        ]
+        rerun_results = self._run(
+            pool,
+            detector,
+            image,
+            [specs[i] for i in rerun],
+            min_threshold,
+            backgrounds,
+            [digests[i] for i in rerun],
+            global_threshold,
+        )
+        for i, result in zip(rerun, rerun_results):
+            results[i] = result
+
+        tables = []
+        for ((bx0, by0, bx1, by1), core), (sources, _, threshold) in zip(
+            specs, results
+        ):
+            if sources is None or len(sources) == 0:
+                continue
+
+            ratio = global_threshold / threshold
+            sources = sources[sources["significance"] > ratio]
+            sources["significance"] = sources["significance"] / ratio
+            if sources.meta["flux_scales_with_threshold"]:
+                sources["flux"] = sources["flux"] / ratio
+            xcol, ycol = StarDetectorInterface.centroid_columns(sources)
+            sources[xcol] = sources[xcol] + bx0
+            sources[ycol] = sources[ycol] + by0
+            tables.append(sources)
+
+        if not tables:
+            return None
+
+        sources = vstack(tables, metadata_conflicts="silent")
+
+        # vstack drops photutils' deprecated-name aliases; use the
+        # xcentroid/ycentroid names the rest of the app reads
+        xcol, ycol = StarDetectorInterface.centroid_columns(sources)
+        sources.rename_columns([xcol, ycol], ["xcentroid", "ycentroid"])
+
+        sources = sources[self._dedupe(sources, h, w)]
+        sources["id"] = np.arange(1, len(sources) + 1)
+        sources.meta["min_threshold"] = min_threshold
+        return sources
+
+    def _pool(self, tiles):
+        """
+        The session's process pool, or None when tiles run in this process.
+        """
+        if self.workers == 1 or tiles == 1:
+            return None
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.START_METHOD),
+                )
+            return self._executor
+
+    def _discard_pool(self, pool):
+        # A worker died; the next detect() starts a new pool
+        with self._executor_lock:
+            if self._executor is pool:
+                self._executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(
+        self,
+        pool,
+        detector,
+        image,
+        specs,
+        min_threshold,
+        backgrounds,
+        digests,
+        threshold=None,
+    ):
+        """
+        (sources, rms sample, threshold) per tile, on pool (None runs them
+        here). Background maps come from and go to backgrounds when given.
+        """
+        cached = [None] * len(specs)
+        if backgrounds is not None:
+            cached = [backgrounds.lookup(digest) for digest in digests]
+
+        def args(i):
+            (bx0, by0, bx1, by1), core = specs[i]
+            return (
+                detector,
+                image[by0:by1, bx0:bx1],
+                core,
+                min_threshold,
+                threshold,
+                cached[i],
+                backgrounds is not None,
+            )
+
+        def finish(i, result):
+            sources, rms_sample, threshold, maps = result
+            if maps is not None:
+                backgrounds.store(digests[i], maps)
+            results[i] = sources, rms_sample, threshold
+
+        results = [None] * len(specs)
+        if pool is None:
+            for i in range(len(specs)):
+                finish(i, _detect_tile(*args(i)))
+            return results
+
+        # Keep a bounded number of tiles in flight (each is pickled)
+        pending = {}
+        try:
+            for i in range(len(specs)):
+                pending[i] = pool.submit(_detect_tile, *args(i))
+                if len(pending) >= 2 * self.workers:
+                    first = min(pending)
+                    finish(first, pending.pop(first).result())
+            for i, future in pending.items():
+                finish(i, future.result())
+        except BrokenProcessPool:
+            self._discard_pool(pool)
+            raise
+        return results
+
+    def _dedupe(self, sources, height, width):
+        """
+        Keep-mask removing overlap duplicates. Only stars near a tile seam
+        can be duplicated, so only those go through the spatial grid.
+        """
+        xcol, ycol = StarDetectorInterface.centroid_columns(sources)
+        x = np.asarray(sources[xcol])
+        y = np.asarray(sources[ycol])
+        keep = np.ones(len(x), dtype=bool)
+
+        t = self.TILE_SIZE
+        band = self.OWNERSHIP_SLACK + self.DEDUPE_RADIUS + 0.5
+        near_seam = (np.abs((x + 0.5 + t / 2) % t - t / 2) <= band) | (
+            np.abs((y + 0.5 + t / 2) % t - t / 2) <= band
+        )
+
+        idx = np.flatnonzero(near_seam)
+        keep[idx] = SpatialGrid.dedupe(
+            x[idx],
+            y[idx],
+            self.DEDUPE_RADIUS,
+            priority=np.asarray(sources["significance"])[idx],
+        )
+        return keep
@@ -2,6 +2,11 @@ from abc import ABC, abstractmethod
 from typing import TypedDict, Optional, Any
 import numpy as np
 
+from util.DiskCache import DiskCache
+from util.ImageDigest import ImageDigest
+from util.ImageStore import ImageStore
+from util.PercentileStretch import PercentileStretch
+
 
 class ProcessorResult(TypedDict):
     image_disp: np.ndarray
@@ -57,12 +62,51 @@ class BaseImageProcessorInterface(ABC):
         Utility: normalize array to 0–1 range using percentiles.
         """
 
-        p_low = np.percentile(data, 0.5)
-        p_high = np.percentile(data, 99.5)
+        p_low, p_high = self._percentiles(data)
+        return PercentileStretch.normalize(data, p_low, p_high)
+
+    def _percentiles(self, data: np.ndarray, low=0.5, high=99.5, dtype=None):
+        """
+        Utility: (low, high) percentiles of data (as if converted to
+        dtype; see PercentileStretch), reused from the disk cache (see
+        DiskCache) for pixels normalized before.
+        """
+        return self._cached_percentiles(
+            lambda: ImageDigest.of(data),
+            lambda: PercentileStretch.percentiles(data, low, high, dtype),
+            low,
+            high,
+            dtype,
+        )
+
+    def _percentiles_streamed(self, chunks, data_dtype, low=0.5, high=99.5, dtype=None):
+        """
+        Utility: _percentiles() of the input image read in chunks (see
+        PercentileStretch.percentiles_streamed), disk-cached by the input
+        file's identity.
+        """
+        return self._cached_percentiles(
+            lambda: ImageStore.file_key(self.input_path),
+            lambda: PercentileStretch.percentiles_streamed(
+                chunks, data_dtype, low, high, dtype
+            ),
+            low,
+            high,
+            dtype,
+        )
+
+    def _cached_percentiles(self, identity, compute, low, high, dtype):
+        disk = DiskCache.shared()
+        if disk is None:
+            return compute()
 
-        if p_high > p_low:
-            data = (data - p_low) / (p_high - p_low)
-        else:
-            data = np.zeros_like(data)
+        dtype_key = None if dtype is None else np.dtype(dtype).str
+        key = DiskCache.key(identity(), low, high, dtype_key)
+        entry = disk.get("percentiles", key)
+        if entry is not None:
+            p_low, p_high = entry[0]["values"]
+            return p_low, p_high
 
-        return np.clip(data, 0, 1)
+        p_low, p_high = compute()
+        disk.put("percentiles", key, {"values": np.array([p_low, p_high])})
+        return p_low, p_high
@@ -7,9 +7,58 @@ import numpy as np
 from astropy.io import fits
 from astropy.wcs import WCS
 
+from util.ImageStore import ImageStore
+from util.PercentileStretch import PercentileStretch
+
 
 class FitsProcessor(BaseImageProcessorInterface):
+    # Stream the HDU into one shared float32 copy (ImageStore.read_fits)
+    # and derive the display image chunk by chunk. fits_data, and
+    # detection_data for mono frames, are that same read-only array, and
+    # original_color is the display image. False restores the eager load
+    # with independent copies of every array.
+    LAZY_LOAD = True
+
     def load(self) -> ProcessorResult:
+        if not self.LAZY_LOAD:
+            return self._load_eager()
+
+        data, header = ImageStore.shared().read_fits(self.input_path)
+        if data is None:
+            raise ValueError("FITS primary HDU has no image data")
+
+        # Ensure detection_data is 2D (collapse channels if needed)
+        if data.ndim == 3:
+            detection_data = np.mean(data, axis=0)
+        else:
+            detection_data = data
+
+        # Create WCS object
+        wcs = WCS(header)
+
+        # Prepare display image (normalized to 0–255)
+        p_low, p_high = self._percentiles(data)
+        image_disp = PercentileStretch.to_uint8(data, p_low, p_high)
+
+        # Ensure display is HWC (OpenCV compatible); mono frames repeat the
+        # single plane through a read-only broadcast view
+        if image_disp.ndim == 2:
+            image_disp = np.broadcast_to(image_disp[..., None], image_disp.shape + (3,))
+        elif image_disp.ndim == 3:
+            # Convert CHW → HWC if needed
+            if image_disp.shape[0] in (3, 4):
+                image_disp = np.transpose(image_disp[:3], (1, 2, 0))
+
+        return {
+            "image_disp": image_disp,
+            "detection_data": detection_data,
+            "original_color": image_disp,
+            "wcs": wcs,
+            "fits_header": header,
+            "fits_data": data,
+        }
+
+    def _load_eager(self) -> ProcessorResult:
         hdu = fits.open(self.input_path)[0]
 
         data = hdu.data.astype(np.float32)
@@ -24,8 +73,7 @@ class FitsProcessor(BaseImageProcessorInterface):
         wcs = WCS(hdu.header)
 
         # Prepare display image (normalized to 0–255)
-        p_low = np.percentile(data, 0.5)
-        p_high = np.percentile(data, 99.5)
+        p_low, p_high = self._percentiles(data)
 
         if p_high > p_low:
             norm = (data - p_low) / (p_high - p_low)
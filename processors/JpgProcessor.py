@@ -3,13 +3,14 @@ from processors.BaseImageProcessorInterface import (
     ProcessorResult,
 )
 
-from PIL import Image
 import numpy as np
 
+from util.ImageStore import ImageStore
+
 
 class JpgProcessor(BaseImageProcessorInterface):
     def load(self) -> ProcessorResult:
-        img = Image.open(self.input_path)
+        img = ImageStore.shared().read_pil(self.input_path)
 
         # Ensure RGB (handle edge cases)
         if img.mode == "RGBA":
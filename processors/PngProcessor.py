@@ -1,15 +1,15 @@
-from PIL import Image
 import numpy as np
 
 from processors.BaseImageProcessorInterface import (
     BaseImageProcessorInterface,
     ProcessorResult,
 )
+from util.ImageStore import ImageStore
 
 
 class PngProcessor(BaseImageProcessorInterface):
     def load(self) -> ProcessorResult:
-        img = Image.open(self.input_path)
+        img = ImageStore.shared().read_pil(self.input_path)
 
         # Ensure RGB
         if img.mode == "RGBA":
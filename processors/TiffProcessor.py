@@ -4,37 +4,74 @@ from processors.BaseImageProcessorInterface import (
 )
 
 import numpy as np
-import tifffile as tiff
+
+from util.ImageStore import ImageStore
+from util.PercentileStretch import PercentileStretch
+from util.TiffBandReader import TiffBandReader
 
 
 class TiffProcessor(BaseImageProcessorInterface):
-    def load(self) -> ProcessorResult:
-        data = tiff.imread(self.input_path)
-        original_dtype = data.dtype
+    # Read the file in strips / tiles (TiffBandReader) and build the
+    # outputs band by band, so neither the raw image nor a float32 copy of
+    # it is held in full. False (or a TIFF layout without band access)
+    # reads the whole image through the ImageStore.
+    STREAM_BANDS = True
 
-        # Convert to float32 for safe processing
-        data = data.astype(np.float32)
+    # Compressed files are decoded once per pass over the bands (two or
+    # three passes); below this raw size one whole-image read is faster
+    STREAM_MIN_COMPRESSED_BYTES = 256 * 1024 * 1024
 
-        # --- Normalize (match current behavior exactly)
-        p_low = np.percentile(data, 0.5)
-        p_high = np.percentile(data, 99.5)
+    def load(self) -> ProcessorResult:
+        store = ImageStore.shared()
+        raw = store.peek(self.input_path, "tifffile")
+        reader = None
+        if raw is None and self.STREAM_BANDS:
+            reader = TiffBandReader(self.input_path)
+            if reader.mode == "full" or (
+                reader.mode == "segments"
+                and reader.nbytes < self.STREAM_MIN_COMPRESSED_BYTES
+            ):
+                reader = None
 
-        if p_high > p_low:
-            data = (data - p_low) / (p_high - p_low)
+        if reader is None:
+            if raw is None:
+                raw = store.read_tiff(self.input_path)
+            shape, original_dtype = raw.shape, raw.dtype
+
+            # --- Normalize (match current behavior exactly). Clip points
+            # come from the native pixels (a histogram for 8/16-bit data).
+            p_low, p_high = self._percentiles(raw, dtype=np.float32)
+            bands = ((rows, raw[rows]) for rows in PercentileStretch.row_chunks(raw))
         else:
-            data = np.zeros_like(data)
+            shape, original_dtype = reader.shape, reader.dtype
+
+            # Same clip points, streamed from the file
+            p_low, p_high = self._percentiles_streamed(
+                lambda: (band for _, band in reader.bands()),
+                original_dtype,
+                dtype=np.float32,
+            )
+            bands = reader.bands()
 
-        data = np.clip(data, 0, 1)
+        image_disp = np.empty(shape, dtype=np.uint8)
+        detection_data = np.empty(
+            shape[:2] if len(shape) == 3 else shape, dtype=np.float32
+        )
+        for rows, band in bands:
+            # Convert to float32 for safe processing
+            data = band.astype(np.float32)
+            PercentileStretch.normalize(data, p_low, p_high, out=data)
 
-        # --- Detection data (float grayscale)
-        detection_data = data.copy()
-        detection_data = self._to_grayscale(detection_data)
+            # --- Detection data (float grayscale)
+            detection_data[rows] = self._to_grayscale(data)
 
-        # --- Display image (uint8 RGB)
-        image_disp = (data * 255).astype(np.uint8)
+            # --- Display image (uint8 RGB)
+            np.multiply(data, 255, out=data)
+            image_disp[rows] = data
 
-        # --- Original color (for spike rendering)
-        original_color = image_disp.copy()
+        # --- Original color (for spike rendering); shares the display
+        # image, which is read-only once stored
+        original_color = image_disp
 
         # If grayscale input, no color
         if image_disp.ndim != 3:
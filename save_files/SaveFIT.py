@@ -37,6 +37,22 @@ class SaveFIT:
                 except Exception:
                     pass
 
+        # Record how many stars received spikes (and any cap applied)
+        stats = p.render_stats
+        if stats is not None:
+            hdu.header["SPKSTARS"] = (
+                stats["stars_rendered"],
+                "Stars rendered with diffraction spikes",
+            )
+            hdu.header["SPKELIG"] = (
+                stats["stars_eligible"],
+                "Stars eligible for spikes before cap",
+            )
+            hdu.header["SPKCAP"] = (
+                stats["star_cap"] or 0,
+                "Brightest-N spike cap (0 = none)",
+            )
+
         hdu.writeto(output_path, overwrite=True)
         print(f"Saved FITS to {output_path} (mode={mode})")
 
@@ -65,6 +81,7 @@ class SaveFIT:
             "blur_kernel_size": p.blur_kernel_size,
             "blur_multiplier": p.blur_multiplier,
             "rotation_angle": p.rotation_angle,
+            "max_stars": p.max_stars,
         }
 
         from spikes.SpikeRenderer import SpikeRenderer
@@ -77,6 +94,7 @@ class SaveFIT:
             sources=sources,
             input_path=p.input_image.lower(),
         )
+        p.render_stats = renderer.last_render_stats
 
         rendered_gray = np.mean(rendered.astype(np.float32), axis=2)
         rendered_norm = rendered_gray / 255.0
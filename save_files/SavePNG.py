@@ -1,6 +1,7 @@
 import numpy as np
 from PIL import Image
-import cv2
+
+from util.ImageStore import ImageStore
 
 SPIKE_INTENSITY = 0.5
 
@@ -14,14 +15,8 @@ class SavePNG:
 
         # Load original image from disk (not preview)
         try:
-            original = cv2.imread(p.input_image, cv2.IMREAD_UNCHANGED)
-            if original is None:
-                raise ValueError("Failed to load image")
-
-            # Convert BGR → RGB if needed
-            if len(original.shape) == 3:
-                original = cv2.cvtColor(original, cv2.COLOR_BGR2RGB)
-
+            # Same decode the processor loaded (see ImageStore.read_rgb)
+            original = ImageStore.shared().read_rgb(p.input_image)
             original = original.astype(np.float32)
 
         except Exception as e:
@@ -64,6 +59,7 @@ class SavePNG:
             "blur_kernel_size": p.blur_kernel_size,
             "blur_multiplier": p.blur_multiplier,
             "rotation_angle": p.rotation_angle,
+            "max_stars": p.max_stars,
         }
 
         renderer = SpikeRenderer(params)
@@ -1,6 +1,8 @@
 import numpy as np
 import tifffile as tiff
 
+from util.ImageStore import ImageStore
+
 SPIKE_INTENSITY = 0.5
 
 
@@ -13,7 +15,7 @@ class SaveTIFF:
 
         # TIFF save should work from the original TIFF source data
         try:
-            original = tiff.imread(p.input_image).astype(np.float32)
+            original = ImageStore.shared().read_tiff(p.input_image).astype(np.float32)
         except Exception as e:
             print(f"Failed to load original TIFF data: {e}")
             return
@@ -54,6 +56,7 @@ class SaveTIFF:
             "blur_kernel_size": p.blur_kernel_size,
             "blur_multiplier": p.blur_multiplier,
             "rotation_angle": p.rotation_angle,
+            "max_stars": p.max_stars,
         }
 
         renderer = SpikeRenderer(params)
@@ -1,6 +1,10 @@
+import time
+
 import numpy as np
 import cv2
-import math
+
+from spikes.SpikeStampCache import SpikeStampCache
+from util.DebugLog import DebugLog
 
 # Shared parameter keys
 PARAM_SPIKE_LENGTH_MULTIPLIER = "spike_length_multiplier"
@@ -8,6 +12,8 @@ PARAM_SPIKE_THICKNESS_MULTIPLIER = "spike_thickness_multiplier"
 PARAM_BLUR_KERNEL_SIZE = "blur_kernel_size"
 PARAM_BLUR_MULTIPLIER = "blur_multiplier"
 PARAM_ROTATION_ANGLE = "rotation_angle"
+PARAM_RENDER_THREADS = "render_threads"
+PARAM_MAX_STARS = "max_stars"
 
 
 class BaseSpikeRendererLogic:
@@ -85,6 +91,25 @@ class BaseSpikeRendererLogic:
     BLUR_KERNEL_SCALE = 3.5  # amplifies slider impact on kernel size
     BLUR_SIGMA_SCALE = 3  # amplifies blur strength (sigma)
 
+    # Optional cap on rendered stars (brightest N); None renders all.
+    # Overridden per render by params["max_stars"].
+    MAX_RENDERED_STARS = None
+
+    # Spike layer tile size (native pixels); only touched tiles are allocated
+    TILE_SIZE = 512
+
+    # Blend factor of the spike contribution
+    SPIKE_ALPHA = 0.85
+
+    # Session-wide stamp cache shared by all renderers
+    _stamp_cache = SpikeStampCache()
+
+    # Optional SpikeTileEngine (set by SpikeRenderer); None renders serially
+    tile_engine = None
+
+    # Star counts/cap of the most recent render (output metadata)
+    last_render_stats = None
+
     def _render_common(
         self,
         image,
@@ -106,251 +131,443 @@ class BaseSpikeRendererLogic:
 
         h, w = image_disp.shape[:2]
 
+        t_start = time.perf_counter()
         scale_ss = 2
-        overlay_ss = cv2.resize(
-            image_disp, (w * scale_ss, h * scale_ss), interpolation=cv2.INTER_LINEAR
+
+        plan = self._plan_spikes(
+            sources,
+            w,
+            h,
+            scale_ss,
+            is_fits=is_fits,
+            threshold=threshold,
+            flux_boost=flux_boost,
+            bit_depth_mode=bit_depth_mode,
         )
 
-        if overlay_ss.ndim == 3 and overlay_ss.shape[2] == 4:
-            overlay_ss = overlay_ss[:, :, :3]
+        k_star = max(
+            3, int(self.params[PARAM_BLUR_KERNEL_SIZE] * self.BLUR_KERNEL_SCALE)
+        )
+        if k_star % 2 == 0:
+            k_star += 1
 
-        max_flux = np.max(sources["flux"]) if len(sources) > 0 else 1.0
+        sigma_star = max(
+            0.5, self.params[PARAM_BLUR_MULTIPLIER] * self.BLUR_SIGMA_SCALE
+        )
 
-        for s in sources[:1000]:
-            x = int(s["xcentroid"] * scale_ss)
-            y = int(s["ycentroid"] * scale_ss)
+        # Supersampled glow blur (baked into each stamp)
+        k_opt = k_star
+        sigma_opt = max(0.3, self.params[PARAM_BLUR_MULTIPLIER] * self.BLUR_SIGMA_SCALE)
 
-            if x < 0 or x >= w * scale_ss or y < 0 or y >= h * scale_ss:
-                continue
+        k_opt = self._gaussian_support(k_opt, sigma_opt)
+        k_star = self._gaussian_support(k_star, sigma_star)
+
+        # Native-resolution glow blur (applied to the spike layer per tile)
+        k = int(self.params[PARAM_BLUR_KERNEL_SIZE] * self.BLUR_KERNEL_SCALE)
+        if k % 2 == 0:
+            k += 1
+
+        if k > 1 and self.params[PARAM_BLUR_MULTIPLIER] > 0:
+            sigma = self.params[PARAM_BLUR_MULTIPLIER] * (self.BLUR_SIGMA_SCALE * 0.5)
+            native_blur = (self._gaussian_support(k, sigma), sigma)
+        else:
+            native_blur = None
+
+        t_plan = time.perf_counter()
+        stars_planned = len(plan["x"])
+        max_stars = self.params.get(PARAM_MAX_STARS, self.MAX_RENDERED_STARS)
+        plan = self._cap_brightest(plan, max_stars)
+
+        stars = self._prepare_stamps(
+            plan,
+            scale_ss,
+            (
+                self.params[PARAM_ROTATION_ANGLE],
+                k_star,
+                sigma_star,
+                scale_ss,
+                k_opt,
+                sigma_opt,
+            ),
+        )
+        t_stamps = time.perf_counter()
+        halo = native_blur[0] // 2 if native_blur is not None else 0
 
-            flux_ref = (
-                np.percentile(sources["flux"], 99) if len(sources) > 10 else max_flux
+        tiles = self._assign_tiles(stars, w, h, halo)
+
+        def render_tile(tile, idx):
+            self._render_tile(image_disp, tile, idx, stars, native_blur)
+
+        if self.tile_engine is not None:
+            self.tile_engine.run(tiles, render_tile)
+        else:
+            for tile, idx in tiles:
+                render_tile(tile, idx)
+
+        self.last_render_stats = {
+            "stars_in_catalog": len(sources) if sources is not None else 0,
+            "stars_eligible": stars_planned,
+            "stars_rendered": len(stars["px"]),
+            "star_cap": max_stars,
+            "capped": len(stars["px"]) < stars_planned,
+            "plan_seconds": t_plan - t_start,
+            "stamp_seconds": t_stamps - t_plan,
+            "render_seconds": time.perf_counter() - t_start,
+        }
+        DebugLog.log("RENDER STATS:", self.last_render_stats)
+        DebugLog.log("STAMP CACHE:", self._stamp_cache.stats())
+
+        return image_disp
+
+    @staticmethod
+    def _gaussian_support(k, sigma):
+        """
+        Clamp an odd Gaussian kernel size to +/- 4 sigma.
+
+        The blur slider drives kernel size and sigma independently, so large
+        kernels with small sigma are common; taps past 4 sigma carry < 0.01%
+        of the weight but dominate the cost (and the stamp/halo size).
+        """
+        return min(k, max(3, int(round(sigma * 8 + 1)) | 1))
+
+    @staticmethod
+    def _cap_brightest(plan, max_stars):
+        """
+        Keep only the brightest max_stars entries of a plan (catalog order kept).
+        """
+        if max_stars is None or len(plan["x"]) <= max_stars:
+            return plan
+
+        brightest = np.argsort(-plan["flux"], kind="stable")[: max(0, int(max_stars))]
+        keep = np.sort(brightest)
+        return {key: values[keep] for key, values in plan.items()}
+
+    def _prepare_stamps(self, plan, scale_ss, stamp_args):
+        """
+        Resolve each planned star to a native-resolution stamp.
+
+        Distinct (length, thickness, phase) combinations are fetched from
+        the stamp cache once per render; stars reference them by index.
+        """
+        length = self._stamp_cache.quantize_length(plan["length"])
+        phase_x = plan["x"] % scale_ss
+        phase_y = plan["y"] % scale_ss
+
+        keys = np.stack([length, plan["thickness"], phase_x, phase_y], axis=1)
+        unique_keys, stamp_idx = np.unique(keys, axis=0, return_inverse=True)
+        stamp_idx = stamp_idx.reshape(-1)
+
+        stamps = [
+            self._stamp_cache.get_stamp(
+                ln, th, *stamp_args, phase_x=phx, phase_y=phy
             )
+            for ln, th, phx, phy in unique_keys.tolist()
+        ]
+        radii = np.array([st.shape[0] // 2 for st in stamps], dtype=np.int64)
+
+        return {
+            "px": plan["x"] // scale_ss,
+            "py": plan["y"] // scale_ss,
+            "radius": radii[stamp_idx] if len(stamps) else stamp_idx,
+            "stamp": stamp_idx,
+            "stamps": stamps,
+            "intensity": plan["intensity"],
+        }
+
+    def _assign_tiles(self, stars, width, height, halo):
+        """
+        Group stars by the tiles their stamp box (plus halo) overlaps.
 
-            flux_norm = float(s["flux"]) / float(flux_ref) if flux_ref > 0 else 0.0
-            flux_norm = min(flux_norm, 1.0)
-            flux_norm = min(1.0, flux_norm * flux_boost)
+        Yields ((x0, y0, x1, y1), star_indices) for every touched tile, with
+        star indices in plan order so accumulation order is deterministic.
+        """
+        n = len(stars["px"])
+        if n == 0:
+            return
+
+        t = self.TILE_SIZE
+        n_tx = -(-width // t)
+        n_ty = -(-height // t)
+
+        r = stars["radius"]
+        ix0 = np.clip((stars["px"] - r - halo) // t, 0, n_tx - 1)
+        ix1 = np.clip((stars["px"] + r + halo) // t, 0, n_tx - 1)
+        iy0 = np.clip((stars["py"] - r - halo) // t, 0, n_ty - 1)
+        iy1 = np.clip((stars["py"] + r + halo) // t, 0, n_ty - 1)
+
+        # Expand each star into the (tile_y, tile_x) cells it covers
+        nx = ix1 - ix0 + 1
+        counts = nx * (iy1 - iy0 + 1)
+        star_idx = np.repeat(np.arange(n), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        nx = np.repeat(nx, counts)
+        tile_x = np.repeat(ix0, counts) + k % nx
+        tile_y = np.repeat(iy0, counts) + k // nx
+        tile_id = tile_y * n_tx + tile_x
+
+        order = np.argsort(tile_id, kind="stable")
+        tile_id = tile_id[order]
+        star_idx = star_idx[order]
+
+        ids, starts = np.unique(tile_id, return_index=True)
+        ends = np.append(starts[1:], len(tile_id))
+
+        for tid, s0, s1 in zip(ids.tolist(), starts.tolist(), ends.tolist()):
+            ty, tx = divmod(tid, n_tx)
+            tile = (tx * t, ty * t, min(width, (tx + 1) * t), min(height, (ty + 1) * t))
+            yield tile, star_idx[s0:s1]
+
+    def _render_tile(self, image_disp, tile, idx, stars, native_blur):
+        """
+        Accumulate, blur and composite the spike layer for one tile.
 
-            if flux_norm < threshold:
+        The float32 layer covers the tile plus a halo wide enough for the
+        native blur, so the tile core matches a full-frame render exactly.
+        """
+        h, w = image_disp.shape[:2]
+        tx0, ty0, tx1, ty1 = tile
+        halo = native_blur[0] // 2 if native_blur is not None else 0
+
+        bx0 = max(0, tx0 - halo)
+        by0 = max(0, ty0 - halo)
+        bx1 = min(w, tx1 + halo)
+        by1 = min(h, ty1 + halo)
+
+        layer = np.zeros((by1 - by0, bx1 - bx0), dtype=np.float32)
+        stamps = stars["stamps"]
+
+        for px, py, r, si, intensity in zip(
+            stars["px"][idx].tolist(),
+            stars["py"][idx].tolist(),
+            stars["radius"][idx].tolist(),
+            stars["stamp"][idx].tolist(),
+            stars["intensity"][idx].tolist(),
+        ):
+            x0 = max(bx0, px - r)
+            x1 = min(bx1, px + r + 1)
+            y0 = max(by0, py - r)
+            y1 = min(by1, py + r + 1)
+
+            if x0 >= x1 or y0 >= y1:
                 continue
 
-            if is_fits:
-                length = int(
-                    (5 + 30 * flux_norm)
-                    * (1.26 + 2.0 * self.params[PARAM_SPIKE_LENGTH_MULTIPLIER])
-                )
-            else:
-                # Tune these values for decent default result estimate
-                if bit_depth_mode == "high32":
-                    length = int(
-                        (self.LENGTH_BASE_HIGH32 + self.LENGTH_SCALE_HIGH32 * flux_norm)
-                        * (
-                            self.LENGTH_MULT_BASE_HIGH32
-                            + self.LENGTH_MULT_SCALE_HIGH32
-                            * self.params[PARAM_SPIKE_LENGTH_MULTIPLIER]
-                        )
-                    )
-                elif bit_depth_mode == "high16":
-                    length = int(
-                        (self.LENGTH_BASE_HIGH16 + self.LENGTH_SCALE_HIGH16 * flux_norm)
-                        * (
-                            self.LENGTH_MULT_BASE_HIGH16
-                            + self.LENGTH_MULT_SCALE_HIGH16
-                            * self.params[PARAM_SPIKE_LENGTH_MULTIPLIER]
-                        )
-                    )
-                else:
-                    length = int(
-                        (self.LENGTH_BASE_LOW + self.LENGTH_SCALE_LOW * flux_norm)
-                        * (
-                            self.LENGTH_MULT_BASE_LOW
-                            + self.LENGTH_MULT_SCALE_LOW
-                            * self.params[PARAM_SPIKE_LENGTH_MULTIPLIER]
-                        )
-                    )
-
-            if length < 3:
-                continue
+            # In-place accumulate (no per-star temporaries)
+            roi = layer[y0 - by0 : y1 - by0, x0 - bx0 : x1 - bx0]
+            cv2.scaleAdd(
+                stamps[si][y0 - py + r : y1 - py + r, x0 - px + r : x1 - px + r],
+                intensity,
+                roi,
+                dst=roi,
+            )
 
-            if is_fits:
-                thickness = max(
-                    1,
-                    int(
-                        (1 + 3 * flux_norm)
-                        * (1.26 + 2.0 * self.params[PARAM_SPIKE_THICKNESS_MULTIPLIER])
-                    ),
-                )
-            else:
-                # Tune these values for decent default result estimate
-
-                if bit_depth_mode == "high32":
-                    thickness = max(
-                        1,
-                        int(
-                            (
-                                self.THICK_BASE_HIGH32
-                                + self.THICK_SCALE_HIGH32 * flux_norm
-                            )
-                            * (
-                                self.THICK_MULT_BASE_HIGH32
-                                + self.THICK_MULT_SCALE_HIGH32
-                                * self.params[PARAM_SPIKE_THICKNESS_MULTIPLIER]
-                            )
-                        ),
-                    )
-                elif bit_depth_mode == "high16":
-                    thickness = max(
-                        1,
-                        int(
-                            (
-                                self.THICK_BASE_HIGH16
-                                + self.THICK_SCALE_HIGH16 * flux_norm
-                            )
-                            * (
-                                self.THICK_MULT_BASE_HIGH16
-                                + self.THICK_MULT_SCALE_HIGH16
-                                * self.params[PARAM_SPIKE_THICKNESS_MULTIPLIER]
-                            )
-                        ),
-                    )
-                else:
-                    thickness = max(
-                        1,
-                        int(
-                            (self.THICK_BASE_LOW + self.THICK_SCALE_LOW * flux_norm)
-                            * (
-                                self.THICK_MULT_BASE_LOW
-                                + self.THICK_MULT_SCALE_LOW
-                                * self.params[PARAM_SPIKE_THICKNESS_MULTIPLIER]
-                            )
-                        ),
-                    )
-            angle_rad = math.radians(self.params[PARAM_ROTATION_ANGLE])
-            cos_a = math.cos(angle_rad)
-            sin_a = math.sin(angle_rad)
-
-            dx = length * cos_a
-            dy = length * sin_a
-
-            dx_p = -length * sin_a
-            dy_p = length * cos_a
-
-            roi_radius = max(8, int(length * scale_ss * 1.5))
-            x0 = max(0, x - roi_radius)
-            x1_roi = min(w * scale_ss, x + roi_radius + 1)
-            y0 = max(0, y - roi_radius)
-            y1_roi = min(h * scale_ss, y + roi_radius + 1)
-
-            roi_h = y1_roi - y0
-            roi_w = x1_roi - x0
-
-            if roi_h <= 1 or roi_w <= 1:
-                continue
+        energy = self._nonzero_bounds(layer)
+        if energy is None:
+            return
+
+        if native_blur is not None:
+            # Blur only the energy bounding box plus halo. The layer is zero
+            # outside it, so this matches blurring the whole buffer.
+            k, sigma = native_blur
+            ey0, ey1, ex0, ex1 = energy
+            ry0, ry1 = max(0, ey0 - halo), min(layer.shape[0], ey1 + halo)
+            rx0, rx1 = max(0, ex0 - halo), min(layer.shape[1], ex1 + halo)
+            layer[ry0:ry1, rx0:rx1] = cv2.GaussianBlur(
+                layer[ry0:ry1, rx0:rx1], (k, k), sigma
+            )
+
+        core = layer[ty0 - by0 : ty1 - by0, tx0 - bx0 : tx1 - bx0]
+
+        # Only pixels where alpha * energy reaches one code value can change
+        ys, xs = np.nonzero(core >= 1.0 / self.SPIKE_ALPHA)
+        if len(ys) == 0:
+            return
+
+        ys += ty0
+        xs += tx0
 
-            x_local = x - x0
-            y_local = y - y0
+        # Blend alpha of the (saturating) spike contribution in one pass
+        base = image_disp[ys, xs]
+        headroom = np.subtract(255, base, dtype=np.float32)
+        spikes = np.minimum(core[ys - ty0, xs - tx0][:, np.newaxis], headroom)
+        image_disp[ys, xs] = (base + self.SPIKE_ALPHA * spikes).astype(np.uint8)
 
-            spike_mask = np.zeros((roi_h, roi_w), dtype=np.float32)
+    @staticmethod
+    def _nonzero_bounds(layer):
+        """
+        Return (y0, y1, x0, x1) of the non-zero region of a 2D layer, or None.
+        """
+        rows = np.flatnonzero(layer.any(axis=1))
+        if len(rows) == 0:
+            return None
+        cols = np.flatnonzero(layer.any(axis=0))
+        return rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
 
-            cv2.line(
-                spike_mask,
-                (x_local, y_local),
-                (int(x_local + dx), int(y_local + dy)),
-                1.0,
-                thickness,
-                lineType=cv2.LINE_AA,
+    def _length_coefficients(self, is_fits, bit_depth_mode):
+        """
+        Return (BASE, SCALE, MULT_BASE, MULT_SCALE) for spike length.
+        """
+        if is_fits:
+            return 5, 30, 1.26, 2.0
+        if bit_depth_mode == "high32":
+            return (
+                self.LENGTH_BASE_HIGH32,
+                self.LENGTH_SCALE_HIGH32,
+                self.LENGTH_MULT_BASE_HIGH32,
+                self.LENGTH_MULT_SCALE_HIGH32,
             )
-            cv2.line(
-                spike_mask,
-                (x_local, y_local),
-                (int(x_local - dx), int(y_local - dy)),
-                1.0,
-                thickness,
-                lineType=cv2.LINE_AA,
+        if bit_depth_mode == "high16":
+            return (
+                self.LENGTH_BASE_HIGH16,
+                self.LENGTH_SCALE_HIGH16,
+                self.LENGTH_MULT_BASE_HIGH16,
+                self.LENGTH_MULT_SCALE_HIGH16,
             )
-            cv2.line(
-                spike_mask,
-                (x_local, y_local),
-                (int(x_local + dx_p), int(y_local + dy_p)),
-                1.0,
-                thickness,
-                lineType=cv2.LINE_AA,
+        return (
+            self.LENGTH_BASE_LOW,
+            self.LENGTH_SCALE_LOW,
+            self.LENGTH_MULT_BASE_LOW,
+            self.LENGTH_MULT_SCALE_LOW,
+        )
+
+    def _thickness_coefficients(self, is_fits, bit_depth_mode):
+        """
+        Return (BASE, SCALE, MULT_BASE, MULT_SCALE) for spike thickness.
+        """
+        if is_fits:
+            return 1, 3, 1.26, 2.0
+        if bit_depth_mode == "high32":
+            return (
+                self.THICK_BASE_HIGH32,
+                self.THICK_SCALE_HIGH32,
+                self.THICK_MULT_BASE_HIGH32,
+                self.THICK_MULT_SCALE_HIGH32,
             )
-            cv2.line(
-                spike_mask,
-                (x_local, y_local),
-                (int(x_local - dx_p), int(y_local - dy_p)),
-                1.0,
-                thickness,
-                lineType=cv2.LINE_AA,
+        if bit_depth_mode == "high16":
+            return (
+                self.THICK_BASE_HIGH16,
+                self.THICK_SCALE_HIGH16,
+                self.THICK_MULT_BASE_HIGH16,
+                self.THICK_MULT_SCALE_HIGH16,
             )
+        return (
+            self.THICK_BASE_LOW,
+            self.THICK_SCALE_LOW,
+            self.THICK_MULT_BASE_LOW,
+            self.THICK_MULT_SCALE_LOW,
+        )
 
-            k_star = max(
-                3, int(self.params[PARAM_BLUR_KERNEL_SIZE] * self.BLUR_KERNEL_SCALE)
-            )
-            if k_star % 2 == 0:
-                k_star += 1
+    def _plan_spikes(
+        self,
+        sources,
+        width,
+        height,
+        scale_ss,
+        *,
+        is_fits,
+        threshold,
+        flux_boost,
+        bit_depth_mode,
+    ):
+        """
+        Vectorized planning stage.
 
-            sigma_star = max(
-                0.5, self.params[PARAM_BLUR_MULTIPLIER] * self.BLUR_SIGMA_SCALE
-            )
-            spike_mask = cv2.GaussianBlur(spike_mask, (k_star, k_star), sigma_star)
+        Computes flux_ref once and derives per-star spike geometry for the
+        whole catalog as NumPy arrays, before any rasterizing starts.
+        Positions and ROI bounds are in supersampled pixel coordinates.
 
-            yy_roi, xx_roi = np.indices((roi_h, roi_w))
-            dx_roi = xx_roi - x_local
-            dy_roi = yy_roi - y_local
-            r = np.sqrt(dx_roi * dx_roi + dy_roi * dy_roi)
+        Returns:
+            dict of equally sized arrays: x, y, flux, flux_norm, length,
+            thickness, roi_x0, roi_x1, roi_y0, roi_y1, intensity
+        """
+        n_total = len(sources) if sources is not None else 0
 
-            r_norm = r / (length * scale_ss + 1e-6)
-            falloff = np.exp(-2.0 * r_norm)
-            spike_mask *= falloff
+        if n_total == 0:
+            flux_all = np.zeros(0, dtype=np.float64)
+        else:
+            flux_all = np.asarray(sources["flux"], dtype=np.float64)
 
-            if is_fits:
-                intensity = 150 * (0.6 + 0.8 * flux_norm)
-            else:
-                intensity = 135 * (0.55 + 0.7 * flux_norm)
+        max_flux = np.max(flux_all) if n_total > 0 else 1.0
+        flux_ref = float(np.percentile(flux_all, 99)) if n_total > 10 else max_flux
 
-            spike_rgb = np.repeat(spike_mask[:, :, np.newaxis], 3, axis=2)
-            roi = overlay_ss[y0:y1_roi, x0:x1_roi].astype(np.float32)
-            roi = np.clip(roi + (spike_rgb * intensity), 0, 255)
-            overlay_ss[y0:y1_roi, x0:x1_roi] = roi.astype(np.uint8)
+        n = n_total
+        flux = flux_all
 
-        k_opt = max(
-            3, int(self.params[PARAM_BLUR_KERNEL_SIZE] * self.BLUR_KERNEL_SCALE)
-        )
-        if k_opt % 2 == 0:
-            k_opt += 1
+        if n > 0:
+            xc = np.asarray(sources["xcentroid"], dtype=np.float64)
+            yc = np.asarray(sources["ycentroid"], dtype=np.float64)
+        else:
+            xc = np.zeros(0, dtype=np.float64)
+            yc = np.zeros(0, dtype=np.float64)
 
-        sigma_opt = max(0.3, self.params[PARAM_BLUR_MULTIPLIER] * self.BLUR_SIGMA_SCALE)
-        overlay_ss = cv2.GaussianBlur(overlay_ss, (k_opt, k_opt), sigma_opt)
+        valid = np.isfinite(xc) & np.isfinite(yc) & np.isfinite(flux)
+        xc = np.where(valid, xc, -1.0)
+        yc = np.where(valid, yc, -1.0)
 
-        overlay = cv2.resize(overlay_ss, (w, h), interpolation=cv2.INTER_AREA)
+        # int() truncates toward zero; keep that for sub-pixel negatives
+        x = np.trunc(xc * scale_ss).astype(np.int64)
+        y = np.trunc(yc * scale_ss).astype(np.int64)
 
-        k = int(self.params[PARAM_BLUR_KERNEL_SIZE] * self.BLUR_KERNEL_SCALE)
-        if k % 2 == 0:
-            k += 1
+        keep = valid & (x >= 0) & (x < width * scale_ss)
+        keep &= (y >= 0) & (y < height * scale_ss)
 
-        if k > 1 and self.params[PARAM_BLUR_MULTIPLIER] > 0:
-            overlay = cv2.GaussianBlur(
-                overlay,
-                (k, k),
-                self.params[PARAM_BLUR_MULTIPLIER] * (self.BLUR_SIGMA_SCALE * 0.5),
-            )
+        if flux_ref > 0:
+            flux_norm = np.minimum(np.where(valid, flux, 0.0) / flux_ref, 1.0)
+        else:
+            flux_norm = np.zeros(n, dtype=np.float64)
+        flux_norm = np.minimum(1.0, flux_norm * flux_boost)
 
-        mask = np.any(overlay != image_disp, axis=2)
+        keep &= flux_norm >= threshold
 
-        alpha = 0.85
+        base, scale, mult_base, mult_scale = self._length_coefficients(
+            is_fits, bit_depth_mode
+        )
+        length = (
+            (base + scale * flux_norm)
+            * (mult_base + mult_scale * self.params[PARAM_SPIKE_LENGTH_MULTIPLIER])
+        ).astype(np.int64)
 
-        for c in range(3):
-            image_disp[..., c] = np.where(
-                mask,
-                (overlay[..., c] * alpha + image_disp[..., c] * (1 - alpha)).astype(
-                    np.uint8
-                ),
-                image_disp[..., c],
-            )
+        keep &= length >= 3
 
-        return image_disp
+        base, scale, mult_base, mult_scale = self._thickness_coefficients(
+            is_fits, bit_depth_mode
+        )
+        thickness = np.maximum(
+            1,
+            (
+                (base + scale * flux_norm)
+                * (
+                    mult_base
+                    + mult_scale * self.params[PARAM_SPIKE_THICKNESS_MULTIPLIER]
+                )
+            ).astype(np.int64),
+        )
+
+        roi_radius = np.maximum(8, (length * scale_ss * 1.5).astype(np.int64))
+        roi_x0 = np.maximum(0, x - roi_radius)
+        roi_x1 = np.minimum(width * scale_ss, x + roi_radius + 1)
+        roi_y0 = np.maximum(0, y - roi_radius)
+        roi_y1 = np.minimum(height * scale_ss, y + roi_radius + 1)
+
+        keep &= (roi_y1 - roi_y0 > 1) & (roi_x1 - roi_x0 > 1)
+
+        if is_fits:
+            intensity = 150 * (0.6 + 0.8 * flux_norm)
+        else:
+            intensity = 135 * (0.55 + 0.7 * flux_norm)
+
+        return {
+            "x": x[keep],
+            "y": y[keep],
+            "flux": flux[keep],
+            "flux_norm": flux_norm[keep],
+            "length": length[keep],
+            "thickness": thickness[keep],
+            "roi_x0": roi_x0[keep],
+            "roi_x1": roi_x1[keep],
+            "roi_y0": roi_y0[keep],
+            "roi_y1": roi_y1[keep],
+            "intensity": intensity[keep],
+        }
 
     # Preset intensity multipliers
     PRESET_MILD = 0.75
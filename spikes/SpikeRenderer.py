@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any
 
 
 import numpy as np
@@ -10,7 +10,8 @@ from spikes.PngSpikeRenderer import PngSpikeRenderer
 from spikes.JpgSpikeRenderer import JpgSpikeRenderer
 from spikes.TiffSpikeRenderer import TiffSpikeRenderer
 from spikes.FitSpikeRenderer import FitSpikeRenderer
-from spikes.BaseSpikeRendererLogic import BaseSpikeRendererLogic
+from spikes.BaseSpikeRendererLogic import PARAM_RENDER_THREADS
+from spikes.SpikeTileEngine import SpikeTileEngine
 from util.ImageTypeUtil import ImageTypeUtil
 
 
@@ -50,11 +51,22 @@ class SpikeRenderer(SpikeRendererInterface):
 
     def __init__(self, params: dict):
         self.params = params
+        self.last_render_stats = None
         self.png_renderer = PngSpikeRenderer(params)
         self.jpg_renderer = JpgSpikeRenderer(params)
         self.tiff_renderer = TiffSpikeRenderer(params)
         self.fit_renderer = FitSpikeRenderer(params)
 
+        # Tiled multi-threaded rendering shared by all format renderers
+        self.tile_engine = SpikeTileEngine(params.get(PARAM_RENDER_THREADS))
+        for renderer in (
+            self.png_renderer,
+            self.jpg_renderer,
+            self.tiff_renderer,
+            self.fit_renderer,
+        ):
+            renderer.tile_engine = self.tile_engine
+
     def render(
         self,
         image: np.ndarray,
@@ -76,10 +88,17 @@ class SpikeRenderer(SpikeRendererInterface):
         bit_depth_mode = self.params.get("bit_depth_mode", "low")
 
         # Propagate to all renderers
-        self.png_renderer.set_bit_depth_mode(bit_depth_mode)
-        self.jpg_renderer.set_bit_depth_mode(bit_depth_mode)
-        self.tiff_renderer.set_bit_depth_mode(bit_depth_mode)
-        self.fit_renderer.set_bit_depth_mode(bit_depth_mode)
+        for renderer in (
+            self.png_renderer,
+            self.jpg_renderer,
+            self.tiff_renderer,
+            self.fit_renderer,
+        ):
+            renderer.set_bit_depth_mode(bit_depth_mode)
 
         renderer_for_type = ImageTypeUtil.get_renderer_for_path(input_path, self)
-        return renderer_for_type.render(image_disp, sources, input_path)
+        rendered = renderer_for_type.render(image_disp, sources, input_path)
+
+        # Star counts / cap of this render (see BaseSpikeRendererLogic)
+        self.last_render_stats = renderer_for_type.last_render_stats
+        return rendered
@@ -0,0 +1,323 @@
+import math
+
+import cv2
+import numpy as np
+
+from util.LRUCache import LRUCache
+
+
+def _gaussian_cdf_table(extent=8.0, samples=4097):
+    """
+    Return (grid, cdf) for the standard normal CDF on [-extent, extent].
+    """
+    grid = np.linspace(-extent, extent, samples)
+    pdf = np.exp(-0.5 * grid * grid)
+    cdf = np.cumsum(pdf) - 0.5 * pdf
+    return grid, cdf / pdf.sum()
+
+
+def _falloff_table(extent=8.0, step=1.0 / 1024):
+    """
+    Return exp(-2 x) sampled every `step` on [0, extent] (x = r / L).
+    """
+    return np.exp(-2.0 * np.arange(0.0, extent + step, step)).astype(np.float32)
+
+
+class SpikeStampCache:
+    """
+    Bounded LRU cache of pre-blurred, falloff-weighted spike stamps.
+
+    A stamp is a square float32 kernel (side 2 * radius + 1, star at the
+    center) holding the four blurred spike arms multiplied by the radial
+    falloff. Rendering a star becomes a scaled copy of its stamp.
+
+    Supersampling is local to the stamp: the spike is drawn at scale_ss,
+    the supersampled softening blur is applied there, and the result is
+    area-downsampled to native resolution for the star's sub-pixel phase.
+    No full-frame supersampled buffer is ever needed.
+
+    Stamps are keyed by quantized (length, thickness, blur, angle) so that
+    most stars in a frame share a handful of entries. Use stats() to tune
+    the quantization against visual error.
+    """
+
+    # Bucket sizes (1 = exact integer lengths, no extra error)
+    LENGTH_QUANTUM = 1
+    ANGLE_QUANTUM = 0.25  # degrees
+
+    # Standard normal CDF sampled on [-8, 8] (1D profile table)
+    _GAUSS_CDF = _gaussian_cdf_table()
+
+    # Radial falloff exp(-2 r / L) by normalized radius r / L. Nearest
+    # sample lookup is within 0.1% of the exact value; beyond the table
+    # end (r > 8 L) the falloff is clamped to its last, ~1e-7 entry.
+    FALLOFF_LUT_STEP = 1.0 / 1024
+    _FALLOFF_LUT = _falloff_table(step=FALLOFF_LUT_STEP)
+
+    def __init__(
+        self,
+        max_entries=512,
+        max_bytes=256 * 1024 * 1024,
+        length_quantum=LENGTH_QUANTUM,
+        angle_quantum=ANGLE_QUANTUM,
+        radius_grid_bytes=64 * 1024 * 1024,
+    ):
+        self.length_quantum = max(1, int(length_quantum))
+        self.angle_quantum = angle_quantum
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes)
+
+        # Distance-from-center grids, one per stamp radius, shared by all
+        # stamps of that size across renders
+        self._radius_grids = LRUCache(max_entries=64, max_bytes=radius_grid_bytes)
+
+    def quantize_length(self, length):
+        """
+        Snap spike length(s) to the length bucket. Accepts scalars or arrays.
+        """
+        q = self.length_quantum
+        if q == 1:
+            return length
+        return np.maximum(q, np.round(np.asarray(length) / q).astype(np.int64) * q)
+
+    def quantize_angle(self, angle_deg):
+        q = self.angle_quantum
+        if not q:
+            return float(angle_deg)
+        return round(round(angle_deg / q) * q, 6)
+
+    @staticmethod
+    def supersampled_radius(length, scale_ss):
+        """
+        Radius of the drawn spike ROI in supersampled pixels.
+        Accepts scalars or NumPy arrays.
+        """
+        return np.maximum(8, (np.asarray(length) * scale_ss * 1.5).astype(np.int64))
+
+    def get_stamp(
+        self,
+        length,
+        thickness,
+        angle_deg,
+        k_blur,
+        sigma_blur,
+        scale_ss,
+        k_ss,
+        sigma_ss,
+        phase_x=0,
+        phase_y=0,
+    ):
+        """
+        Return the native-resolution stamp for the given spike geometry.
+
+        k_blur/sigma_blur soften the spike itself; k_ss/sigma_ss are the
+        supersampled glow blur. phase_x/phase_y give the star position
+        within its native pixel, in supersampled pixels (0..scale_ss-1).
+        """
+        base_key = (
+            int(self.quantize_length(length)),
+            int(thickness),
+            int(k_blur),
+            round(float(sigma_blur), 4),
+            self.quantize_angle(angle_deg),
+            int(scale_ss),
+        )
+        key = base_key + (int(k_ss), round(float(sigma_ss), 4), phase_x, phase_y)
+
+        def build():
+            spike = self._cache.get_or_create(
+                base_key, lambda: self._build_spike(*base_key)
+            )
+            return self._downsample(spike, *key[5:])
+
+        return self._cache.get_or_create(key, build)
+
+    def stats(self) -> dict:
+        """
+        Stamp cache stats, plus the radius grid cache under "radius_grids"
+        and the falloff table size under "falloff_lut_bytes".
+        """
+        stats = self._cache.stats()
+        stats["radius_grids"] = self._radius_grids.stats()
+        stats["falloff_lut_bytes"] = self._FALLOFF_LUT.nbytes
+        return stats
+
+    def reset_stats(self):
+        self._cache.reset_stats()
+        self._radius_grids.reset_stats()
+
+    def clear(self):
+        self._cache.clear()
+        self._radius_grids.clear()
+
+    def radius_grid(self, radius):
+        """
+        Return the (2 * radius + 1)^2 float32 grid of distances from the
+        center pixel (read-only, cached).
+        """
+
+        def build():
+            span = np.arange(-radius, radius + 1, dtype=np.float32)
+            grid = np.sqrt(span[np.newaxis, :] ** 2 + span[:, np.newaxis] ** 2)
+            grid.setflags(write=False)
+            return grid
+
+        return self._radius_grids.get_or_create(int(radius), build)
+
+    @classmethod
+    def falloff(cls, r, length_ss):
+        """
+        exp(-2 r / length_ss) via the falloff table.
+        """
+        lut = cls._FALLOFF_LUT
+        scale = 1.0 / ((length_ss + 1e-6) * cls.FALLOFF_LUT_STEP)
+        idx = np.minimum(r * scale + 0.5, len(lut) - 1).astype(np.intp)
+        return lut[idx]
+
+    def _build_spike(
+        self, length, thickness, k_blur, sigma_blur, angle_deg, scale_ss
+    ):
+        """
+        Evaluate the blurred, falloff-weighted spike at supersampled
+        resolution in closed form.
+
+        The spike is two crossing lines (four arms). A line blurred with a
+        Gaussian is separable in its own frame: a blurred box along the
+        line times a blurred box across it, both read from a precomputed
+        1D Gaussian CDF table. Each line is only evaluated in the narrow
+        band where it is non-zero and multiplied by the exp(-2r/L) falloff;
+        the blurred footprint of the square where the lines cross is
+        subtracted once. No line drawing or 2D blur is involved, so the
+        cost grows with the spike length instead of its area.
+
+        Tolerance vs. the former cv2.line(LINE_AA) + GaussianBlur(k_blur)
+        stamps: same peak, total energy within 2% (up to 30% more on
+        45-degree strokes, which cv2 draws thinner), per-pixel differences
+        up to ~20% of the peak where cv2 stair-steps along oblique strokes
+        and at the round end caps. Rendered frames differ by < 0.5 code
+        values on average and at most ~25 (of 255) on the brightest spikes.
+        """
+        radius = int(self.supersampled_radius(length, scale_ss))
+        size = 2 * radius + 1
+
+        angle_rad = math.radians(angle_deg)
+        cos_a = math.cos(angle_rad)
+        sin_a = math.sin(angle_rad)
+
+        sigma = float(sigma_blur)
+        if sigma <= 0:
+            # Same default OpenCV derives from the kernel size
+            sigma = 0.3 * ((k_blur - 1) * 0.5 - 1) + 0.8
+
+        # Match the stroke weight of cv2.line(LINE_AA): thick strokes are
+        # 2 * ceil(thickness / 2) + 1 wide; one-pixel strokes carry the
+        # weight of an axis-aligned pixel per major-axis step and, off-axis,
+        # spread over a one-pixel tent (modelled as the box of equal variance)
+        if thickness > 1:
+            width = 2 * ((thickness + 1) // 2) + 1
+            weight = 1.0
+        elif max(abs(cos_a), abs(sin_a)) < 1.0 - 1e-9:
+            width = math.sqrt(2.0) * max(abs(cos_a), abs(sin_a))
+            weight = 1.0 / math.sqrt(2.0)
+        else:
+            width = 1.0
+            weight = 1.0
+        half_width = width / 2.0
+        half_length = length + half_width
+        radius_grid = self.radius_grid(radius)
+        reach = half_width + 8.0 * sigma
+
+        stamp = np.zeros((size, size), dtype=np.float32)
+
+        for dir_x, dir_y in ((cos_a, sin_a), (-sin_a, cos_a)):
+            rows, cols, along, across = self._line_band(radius, dir_x, dir_y, reach)
+            line = self._blurred_box(along, half_length, sigma) * self._blurred_box(
+                across, half_width, sigma
+            )
+            falloff = self.falloff(radius_grid[rows, cols], length * scale_ss)
+            stamp[rows, cols] += weight * line * falloff
+
+        # The lines overlap in a width x width square at the center; its
+        # blurred footprint is counted twice above
+        c = min(radius, int(math.ceil(reach * math.sqrt(2.0))))
+        span = np.arange(-c, c + 1, dtype=np.float32)
+        xx = span[np.newaxis, :]
+        yy = span[:, np.newaxis]
+        along = xx * cos_a + yy * sin_a
+        across = yy * cos_a - xx * sin_a
+        overlap = self._blurred_box(along, half_width, sigma) * self._blurred_box(
+            across, half_width, sigma
+        )
+        falloff = self.falloff(self.radius_grid(c), length * scale_ss)
+        stamp[radius - c : radius + c + 1, radius - c : radius + c + 1] -= (
+            weight * overlap * falloff
+        )
+        np.maximum(stamp, 0.0, out=stamp)
+
+        stamp.setflags(write=False)
+        return stamp
+
+    @staticmethod
+    def _line_band(radius, dir_x, dir_y, reach):
+        """
+        Pixels within `reach` of the line through the center with direction
+        (dir_x, dir_y), walked row by row (or column by column for shallow
+        lines). Returns flat row/col indices and the along/across offsets.
+        """
+        steep = abs(dir_y) >= abs(dir_x)
+        if not steep:
+            # Walk columns: swap axes and swap back at the end
+            dir_x, dir_y = dir_y, dir_x
+
+        span = np.arange(-radius, radius + 1, dtype=np.float32)
+        window = int(math.ceil(2.0 * reach / abs(dir_y))) + 2
+        start = np.floor(span * (dir_x / dir_y) - reach / abs(dir_y))
+
+        minor = start[:, np.newaxis] + np.arange(window, dtype=np.float32)
+        major = np.broadcast_to(span[:, np.newaxis], minor.shape)
+        inside = np.abs(minor) <= radius
+        minor = minor[inside]
+        major = major[inside]
+
+        along = minor * dir_x + major * dir_y
+        across = major * dir_x - minor * dir_y
+
+        major_idx = major.astype(np.intp) + radius
+        minor_idx = minor.astype(np.intp) + radius
+        if steep:
+            return major_idx, minor_idx, along, across
+        return minor_idx, major_idx, along, across
+
+    @classmethod
+    def _blurred_box(cls, x, half_width, sigma):
+        """
+        Unit box [-half_width, half_width] convolved with a Gaussian,
+        evaluated at x: Phi((x + w) / sigma) - Phi((x - w) / sigma).
+        """
+        grid, cdf = cls._GAUSS_CDF
+        return (
+            np.interp((x + half_width) / sigma, grid, cdf)
+            - np.interp((x - half_width) / sigma, grid, cdf)
+        ).astype(np.float32)
+
+    @staticmethod
+    def _downsample(spike, scale_ss, k_ss, sigma_ss, phase_x, phase_y):
+        """
+        Place the supersampled spike at its sub-pixel phase, apply the
+        supersampled glow blur and area-downsample to native resolution.
+        """
+        radius_ss = spike.shape[0] // 2
+        radius = int(-(-(radius_ss + k_ss // 2 + 1) // scale_ss))
+        side = 2 * radius + 1
+
+        canvas = np.zeros((side * scale_ss, side * scale_ss), dtype=np.float32)
+        cx = radius * scale_ss + phase_x
+        cy = radius * scale_ss + phase_y
+        canvas[
+            cy - radius_ss : cy + radius_ss + 1, cx - radius_ss : cx + radius_ss + 1
+        ] = spike
+
+        canvas = cv2.GaussianBlur(canvas, (k_ss, k_ss), sigma_ss)
+
+        stamp = cv2.resize(canvas, (side, side), interpolation=cv2.INTER_AREA)
+        stamp.setflags(write=False)
+        return stamp
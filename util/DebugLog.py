@@ -0,0 +1,28 @@
+import os
+
+
+class DebugLog:
+    """
+    Opt-in diagnostic output (cache statistics, detection drift, render
+    timings).
+
+    Disabled unless AF_SPIKES_DEBUG=1 (or DebugLog.enabled = True); the
+    numbers stay available from the owning objects' stats() either way.
+    """
+
+    ENV_ENABLE = "AF_SPIKES_DEBUG"
+
+    # Session-wide switch; None defers to the environment variable
+    enabled = None
+
+    @classmethod
+    def is_enabled(cls):
+        enabled = cls.enabled
+        if enabled is None:
+            enabled = os.environ.get(cls.ENV_ENABLE, "").lower() in ("1", "true", "yes")
+        return enabled
+
+    @classmethod
+    def log(cls, *args):
+        if cls.is_enabled():
+            print(*args)
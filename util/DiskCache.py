@@ -0,0 +1,251 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+
+class DiskCache:
+    """
+    Opt-in, content-addressed on-disk cache of NumPy array bundles.
+
+    Entries are uncompressed .npz files under <directory>/<namespace>/,
+    named by a hash of the caller's key (image content digest plus the
+    parameters that produced the data), so reopening a file that was seen
+    before skips the work. Total size is bounded; the least recently used
+    entries (by file mtime, bumped on every hit) are evicted first.
+
+    Disabled unless AF_SPIKES_DISK_CACHE=1 (or DiskCache.enabled = True).
+    The directory defaults to the platform user cache directory and can
+    be moved with AF_SPIKES_CACHE_DIR. Inspect or clear it with:
+
+        python -m util.DiskCache info
+        python -m util.DiskCache clear [namespace]
+    """
+
+    ENV_ENABLE = "AF_SPIKES_DISK_CACHE"
+    ENV_DIRECTORY = "AF_SPIKES_CACHE_DIR"
+    ENV_MAX_BYTES = "AF_SPIKES_CACHE_MAX_MB"
+
+    APP_NAME = "AF_Diffraction_Spikes"
+    DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+    # Session-wide switch; None defers to the environment variable
+    enabled = None
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or self.default_directory()
+        if max_bytes is None:
+            megabytes = os.environ.get(self.ENV_MAX_BYTES)
+            max_bytes = (
+                int(float(megabytes) * 1024 * 1024)
+                if megabytes
+                else self.DEFAULT_MAX_BYTES
+            )
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @classmethod
+    def shared(cls):
+        """
+        The session's DiskCache, or None when the disk cache is disabled.
+        """
+        enabled = cls.enabled
+        if enabled is None:
+            enabled = os.environ.get(cls.ENV_ENABLE, "").lower() in ("1", "true", "yes")
+        if not enabled:
+            return None
+
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def default_directory(cls):
+        directory = os.environ.get(cls.ENV_DIRECTORY)
+        if directory:
+            return directory
+
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        elif sys.platform == "darwin":
+            base = os.path.expanduser("~/Library/Caches")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        return os.path.join(base, cls.APP_NAME)
+
+    @staticmethod
+    def key(*parts):
+        """
+        Stable file key for a tuple of hashable, repr-able parts.
+        """
+        return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+    def get(self, namespace, key):
+        """
+        Return (arrays, meta) for the entry, or None on a miss.
+        """
+        path = self._path(namespace, key)
+        try:
+            with np.load(path, allow_pickle=False) as bundle:
+                arrays = {name: bundle[name] for name in bundle.files}
+            meta = json.loads(str(arrays.pop("__meta__")))
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            # Missing, half-written or foreign file: treat as a miss
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return arrays, meta
+
+    def put(self, namespace, key, arrays, meta=None):
+        """
+        Store a dict of arrays plus JSON-serializable meta, then evict
+        down to max_bytes.
+        """
+        folder = os.path.join(self.directory, namespace)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            payload = {name: np.asarray(value) for name, value in arrays.items()}
+            payload["__meta__"] = np.array(json.dumps(meta or {}, default=str))
+
+            # Write to a temp file and rename, so readers never see a
+            # partial entry
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, **payload)
+                os.replace(tmp, self._path(namespace, key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+        except OSError as e:
+            print(f"[DiskCache] write failed: {e}")
+            return
+
+        with self._lock:
+            self.writes += 1
+        self._evict()
+
+    def entries(self):
+        """
+        List of (namespace, key, bytes, mtime), most recently used first.
+        """
+        found = []
+        if not os.path.isdir(self.directory):
+            return found
+        for namespace in sorted(os.listdir(self.directory)):
+            folder = os.path.join(self.directory, namespace)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                if not name.endswith(".npz"):
+                    continue
+                try:
+                    st = os.stat(os.path.join(folder, name))
+                except OSError:
+                    continue
+                found.append((namespace, name[:-4], st.st_size, st.st_mtime))
+        found.sort(key=lambda entry: entry[3], reverse=True)
+        return found
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        namespaces = {}
+        for namespace, _, size, _ in entries:
+            count, total = namespaces.get(namespace, (0, 0))
+            namespaces[namespace] = (count + 1, total + size)
+        with self._lock:
+            return {
+                "directory": self.directory,
+                "entries": len(entries),
+                "bytes": sum(entry[2] for entry in entries),
+                "max_bytes": self.max_bytes,
+                "namespaces": {
+                    name: {"entries": count, "bytes": total}
+                    for name, (count, total) in namespaces.items()
+                },
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+    def clear(self, namespace=None):
+        """
+        Delete all entries (or those of one namespace). Returns the count.
+        """
+        removed = 0
+        for entry_namespace, key, _, _ in self.entries():
+            if namespace is not None and entry_namespace != namespace:
+                continue
+            try:
+                os.remove(self._path(entry_namespace, key))
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _evict(self):
+        entries = self.entries()
+        total = sum(entry[2] for entry in entries)
+        # Oldest first
+        for namespace, key, size, _ in reversed(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(self._path(namespace, key))
+            except OSError:
+                continue
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def _path(self, namespace, key):
+        return os.path.join(self.directory, namespace, key + ".npz")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m util.DiskCache",
+        description="Inspect or clear the AF Diffraction Spikes disk cache.",
+    )
+    parser.add_argument("--dir", help="cache directory (default: user cache dir)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", help="show size and entries per namespace")
+    clear = commands.add_parser("clear", help="delete cached entries")
+    clear.add_argument("namespace", nargs="?", help="only clear this namespace")
+    args = parser.parse_args(argv)
+
+    cache = DiskCache(args.dir)
+    if args.command == "info":
+        stats = cache.stats()
+        print(f"Directory: {stats['directory']}")
+        print(
+            f"Entries:   {stats['entries']} "
+            f"({stats['bytes'] / 1e6:.1f} MB of {stats['max_bytes'] / 1e6:.0f} MB)"
+        )
+        for name, ns in sorted(stats["namespaces"].items()):
+            print(f"  {name}: {ns['entries']} entries, {ns['bytes'] / 1e6:.1f} MB")
+    else:
+        removed = cache.clear(args.namespace)
+        print(f"Removed {removed} entries from {cache.directory}")
+
+
+if __name__ == "__main__":
+    main()
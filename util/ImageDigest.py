@@ -0,0 +1,20 @@
+import hashlib
+
+import numpy as np
+
+
+class ImageDigest:
+    """
+    Content identity for in-memory images.
+
+    Two arrays get the same digest when they hold the same pixels with the
+    same shape and dtype, regardless of where they came from.
+    """
+
+    @staticmethod
+    def of(image: np.ndarray) -> str:
+        image = np.ascontiguousarray(image)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(str((image.shape, image.dtype.str)).encode())
+        h.update(memoryview(image).cast("B"))
+        return h.hexdigest()
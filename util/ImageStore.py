@@ -0,0 +1,246 @@
+import mmap
+import os
+import threading
+
+import cv2
+import numpy as np
+import tifffile
+from astropy.io import fits
+from PIL import Image
+
+from util.LRUCache import LRUCache
+
+
+class ImageStore:
+    """
+    Session-wide store of decoded images and arrays derived from them.
+
+    Entries are keyed by the file's (absolute path, size, mtime) plus a
+    kind naming the decoder or derivation ("tifffile", "cv2", "pil",
+    "fits", "processor:TiffProcessor", ...). The preview, star count,
+    process and save paths ask for the same kind and share one decode; a
+    file changed on disk gets a new key. Arrays handed out are read-only:
+    copy (e.g. astype) before modifying.
+
+    Memory is bounded by max_bytes with LRU eviction. The budget defaults
+    to 1 GB and can be set with AF_SPIKES_IMAGE_STORE_MB.
+    """
+
+    ENV_MAX_BYTES = "AF_SPIKES_IMAGE_STORE_MB"
+    DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_bytes=None, max_entries=32):
+        if max_bytes is None:
+            megabytes = os.environ.get(self.ENV_MAX_BYTES)
+            max_bytes = (
+                int(float(megabytes) * 1024 * 1024)
+                if megabytes
+                else self.DEFAULT_MAX_BYTES
+            )
+        self._cache = LRUCache(
+            max_entries=max_entries, max_bytes=max_bytes, sizeof=self._sizeof
+        )
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def file_key(path):
+        """
+        (absolute path, size, mtime_ns) identity of a file on disk.
+        """
+        st = os.stat(path)
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+    def get(self, path, kind, load):
+        """
+        Return the `kind` entry for path, calling load(path) on a miss.
+
+        NumPy arrays in the result (directly, or inside a tuple, list or
+        dict) are made read-only.
+        """
+        key = self.file_key(path) + (kind,)
+        return self._cache.get_or_create(key, lambda: self._freeze(load(path)))
+
+    def peek(self, path, kind):
+        """
+        The `kind` entry for path if it is already in the store, else None
+        (nothing is loaded).
+        """
+        key = self.file_key(path) + (kind,)
+        return self._cache.get(key)
+
+    # --- Shared decoders (one entry per file and decoder) ---
+
+    def read_tiff(self, path):
+        """
+        tifffile.imread(path): native-dtype array.
+        """
+        return self.get(path, "tifffile", tifffile.imread)
+
+    def read_cv2(self, path):
+        """
+        cv2.imread(path, IMREAD_UNCHANGED): native dtype, BGR(A) order.
+        Raises ValueError if OpenCV cannot decode the file.
+        """
+
+        def load(path):
+            image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+            if image is None:
+                raise ValueError(f"OpenCV cannot decode '{path}'")
+            return image
+
+        return self.get(path, "cv2", load)
+
+    def read_pil(self, path):
+        """
+        Decoded (loaded) PIL image. Treat it as read-only: convert(),
+        resize() and np.array() all return new objects.
+        """
+
+        def load(path):
+            image = Image.open(path)
+            image.load()
+            return image
+
+        return self.get(path, "pil", load)
+
+    # PNG/JPG modes np.asarray reproduces exactly as cv2.imread does
+    # (IMREAD_UNCHANGED, then BGR -> RGB)
+    LOSSLESS_PIL_MODES = ("L", "I;16", "I", "RGB", "RGBA")
+
+    def read_rgb(self, path):
+        """
+        Native-dtype pixels as a 2D (gray) or HxWx3 RGB array, alpha
+        dropped. For PNG and JPG this is taken from the shared PIL decode
+        (the one their processors use) when its mode holds the pixels
+        losslessly; otherwise from the shared cv2 decode.
+        """
+        image = None
+        if path.lower().endswith((".png", ".jpg", ".jpeg")):
+            try:
+                image = self.read_pil(path)
+            except Exception:
+                pass
+
+        lossless = (
+            image is not None
+            and image.format in ("PNG", "JPEG")
+            and image.mode in self.LOSSLESS_PIL_MODES
+        )
+        if lossless and image.mode in ("RGB", "RGBA"):
+            # PIL opens 16-bit colour PNGs as 8-bit RGB(A)
+            lossless = self._png_bit_depth(path) != 16
+
+        if lossless:
+            rgb = np.asarray(image)
+            return rgb[..., :3] if rgb.ndim == 3 else rgb
+
+        # Other formats, or palette, CMYK, 16-bit colour, ...: PIL would
+        # change the pixels
+        rgb = self.read_cv2(path)
+        if rgb.ndim == 3:
+            rgb = cv2.cvtColor(rgb, cv2.COLOR_BGR2RGB)
+        return rgb
+
+    def read_fits(self, path):
+        """
+        (data, header) of the primary HDU, data as native float32.
+
+        The image is streamed in row chunks through astropy sections
+        (BZERO/BSCALE/BLANK applied exactly as hdu.data does), so the
+        float32 array is the only full-size copy of the science data in
+        memory. Memory-mapping the HDU instead would keep every page read
+        resident for as long as the map is open. data is None for an
+        HDU without an image.
+        """
+
+        def load(path):
+            with fits.open(path, memmap=False) as hdul:
+                hdu = hdul[0]
+                header = hdu.header.copy()
+                if not hdu.header.get("NAXIS"):
+                    return None, header
+                return self._read_fits_rows(hdu), header
+
+        return self.get(path, "fits", load)
+
+    # Rows per chunk when streaming FITS image data
+    FITS_CHUNK_ROWS = 256
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+    def clear(self):
+        self._cache.clear()
+
+    @staticmethod
+    def _png_bit_depth(path):
+        """
+        Bit depth from a PNG's IHDR chunk, or None for other files.
+        """
+        with open(path, "rb") as f:
+            header = f.read(25)
+        if header[:8] != b"\x89PNG\r\n\x1a\n" or len(header) < 25:
+            return None
+        return header[24]
+
+    @classmethod
+    def _read_fits_rows(cls, hdu):
+        shape = hdu.shape
+        data = np.empty(shape, dtype=np.float32)
+        if len(shape) < 2:
+            data[...] = hdu.section[...]
+            return data
+
+        for plane in np.ndindex(*shape[:-2]):
+            for start in range(0, shape[-2], cls.FITS_CHUNK_ROWS):
+                rows = plane + (slice(start, start + cls.FITS_CHUNK_ROWS),)
+                data[rows] = hdu.section[rows]
+        return data
+
+    @classmethod
+    def _freeze(cls, value):
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+        elif isinstance(value, (tuple, list)):
+            for item in value:
+                cls._freeze(item)
+        elif isinstance(value, dict):
+            for item in value.values():
+                cls._freeze(item)
+        return value
+
+    @classmethod
+    def _sizeof(cls, value, seen=None):
+        """
+        RAM held by value. Views count as their owning array, each owner
+        once (e.g. detection_data aliasing fits_data); arrays over a
+        memory map are backed by the file and count as 0.
+        """
+        if seen is None:
+            seen = set()
+        if isinstance(value, np.ndarray):
+            owner = value
+            while isinstance(owner.base, np.ndarray):
+                owner = owner.base
+            if id(owner) in seen or isinstance(owner, np.memmap):
+                return 0
+            seen.add(id(owner))
+            return 0 if isinstance(owner.base, mmap.mmap) else owner.nbytes
+        if isinstance(value, (tuple, list)):
+            return sum(cls._sizeof(item, seen) for item in value)
+        if isinstance(value, dict):
+            return sum(cls._sizeof(item, seen) for item in value.values())
+        if hasattr(value, "getbands"):
+            # PIL image: decoded pixel buffer size
+            band_bytes = 4 if value.mode in ("I", "F") else 2 if ";16" in value.mode else 1
+            return value.width * value.height * len(value.getbands()) * band_bytes
+        return 0
@@ -0,0 +1,103 @@
+import threading
+
+
+class TaskCancelled(Exception):
+    """
+    Raised by CancelToken.check() once a newer task has been submitted.
+    """
+
+
+class CancelToken:
+    """
+    Cancellation flag handed to a running task. Tasks call check() between
+    expensive steps to give up early once they have been superseded.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+
+class LatestTaskWorker:
+    """
+    Single background thread that only cares about the newest request.
+
+    submit() cancels the previous task's token and replaces any task that
+    has not started yet, so at most one task runs and one waits. Results
+    are handed to `post` (e.g. a Tk root.after(0, ...) wrapper) and only
+    delivered if no newer task was submitted in the meantime.
+    """
+
+    def __init__(self, post, name="LatestTaskWorker"):
+        self._post = post
+        self._name = name
+        self._lock = threading.Condition()
+        self._pending = None
+        self._token = None
+        self._thread = None
+
+    def submit(self, task, on_done):
+        """
+        Run task(token) in the background, then on_done(result, error) via
+        post. error is None on success; superseded tasks never call on_done.
+        """
+        with self._lock:
+            if self._token is not None:
+                self._token.cancel()
+            self._token = token = CancelToken()
+            self._pending = (task, on_done, token)
+
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self._name, daemon=True
+                )
+                self._thread.start()
+            self._lock.notify()
+        return token
+
+    def cancel(self):
+        """
+        Cancel the current task and drop any waiting one.
+        """
+        with self._lock:
+            if self._token is not None:
+                self._token.cancel()
+            self._pending = None
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while self._pending is None:
+                    self._lock.wait()
+                task, on_done, token = self._pending
+                self._pending = None
+
+            result, error = None, None
+            try:
+                token.check()
+                result = task(token)
+            except TaskCancelled:
+                continue
+            except Exception as e:
+                error = e
+
+            if not token.cancelled:
+                self._post(
+                    lambda args=(on_done, token, result, error): self._deliver(*args)
+                )
+
+    @staticmethod
+    def _deliver(on_done, token, result, error):
+        # A newer task may have been submitted while this result was queued
+        if not token.cancelled:
+            on_done(result, error)
@@ -0,0 +1,294 @@
+import os
+
+import numpy as np
+
+
+class PercentileStretch:
+    """
+    Shared percentile clip points and linear stretch for display.
+
+    percentiles() returns the same values as np.percentile (linear
+    interpolation) without its full-size copy per call:
+
+    - 8/16-bit integer data: exact, from a histogram built in chunks.
+    - Other data: exact, from one copy partitioned at both clip points
+      at once.
+    - Optionally, for float data larger than sample_limit pixels: from a
+      strided sample of about sample_limit pixels. The clip points are
+      then approximate, with a rank error of about 1/sqrt(sample_limit)
+      on natural images (0.1% at one million samples).
+
+    Sampling is off unless sample_limit is set (or AF_SPIKES_PERCENTILE_SAMPLES).
+
+    percentiles_streamed() gives the same exact values for data read in
+    chunks (e.g. TiffBandReader bands) without holding all of it.
+
+    normalize() and to_uint8() apply the stretch in chunks, optionally in
+    place, so only one chunk of temporaries exists at a time.
+    """
+
+    ENV_SAMPLE_LIMIT = "AF_SPIKES_PERCENTILE_SAMPLES"
+
+    # Session-wide sample size for float data; None defers to the
+    # environment variable, 0 means always exact
+    sample_limit = None
+
+    # Pixels processed per chunk
+    CHUNK_PIXELS = 1 << 20
+
+    @classmethod
+    def percentiles(cls, data, low=0.5, high=99.5, dtype=None):
+        """
+        (low, high) percentiles of data, as np.percentile would return
+        them for data.astype(dtype) (dtype defaults to data's own).
+        """
+        data = np.asarray(data)
+        if dtype is None:
+            dtype = data.dtype if data.dtype.kind == "f" else np.float64
+        dtype = np.dtype(dtype)
+        if data.size == 0:
+            return tuple(np.percentile(data.astype(dtype), (low, high)))
+
+        if data.dtype.kind in "ui" and data.dtype.itemsize <= 2:
+            counts, offset = cls._histogram(data)
+            return cls._from_histogram(counts, offset, low, high, dtype)
+
+        sample = cls._sample(data)
+        positions = [p for q in (low, high) for p in cls._positions(sample.size, q)]
+        values = cls._partitioned(sample, positions)
+        if values is None:
+            # NaNs sort last; np.percentile returns NaN
+            return dtype.type(np.nan), dtype.type(np.nan)
+        return cls._interpolate(sample.size, low, high, dtype, values)
+
+    @classmethod
+    def percentiles_streamed(cls, chunks, data_dtype, low=0.5, high=99.5, dtype=None):
+        """
+        percentiles() of the arrays yielded by chunks() taken together
+        (all of dtype data_dtype), holding one chunk at a time. Exact.
+
+        Values are mapped to order-preserving unsigned integer keys and
+        the keys at the clip positions are selected 16 bits per pass over
+        the data (a radix select): chunks() is called once for 8/16-bit
+        data, twice for 32-bit and four times for 64-bit data.
+        """
+        data_dtype = np.dtype(data_dtype).newbyteorder("=")
+        if dtype is None:
+            dtype = data_dtype if data_dtype.kind == "f" else np.float64
+        dtype = np.dtype(dtype)
+
+        if data_dtype.kind in "ui" and data_dtype.itemsize <= 2:
+            counts = None
+            for chunk in chunks():
+                chunk_counts, offset = cls._histogram(chunk)
+                counts = chunk_counts if counts is None else counts + chunk_counts
+            if counts is None or not counts.any():
+                return cls.percentiles(np.empty(0, data_dtype), low, high, dtype)
+            return cls._from_histogram(counts, offset, low, high, dtype)
+
+        bits = data_dtype.itemsize * 8
+        key_dtype = np.dtype(f"u{data_dtype.itemsize}")
+        sign = key_dtype.type(1 << (bits - 1))
+
+        def keys_of(values):
+            keys = values.view(key_dtype)
+            if data_dtype.kind == "u":
+                return keys
+            if data_dtype.kind == "i":
+                return keys ^ sign
+            # Floats: negative values sort in reverse bit order
+            return np.where(keys & sign, ~keys, keys | sign)
+
+        def value_of(key):
+            key = key_dtype.type(key)
+            if data_dtype.kind == "i":
+                key = key ^ sign
+            elif data_dtype.kind == "f":
+                key = key ^ sign if key & sign else ~key
+            return np.array(key, dtype=key_dtype).view(data_dtype)[()]
+
+        # located: sorted position -> (key bits selected so far, rank
+        # among the values sharing them)
+        count = 0
+        located = None
+        for shift in range(bits - 16, -1, -16):
+            prefixes = {None} if located is None else {p for p, _ in located.values()}
+            counts = {prefix: np.zeros(1 << 16, dtype=np.int64) for prefix in prefixes}
+            for chunk in chunks():
+                for rows in cls.row_chunks(chunk):
+                    # Native byte order, so the key view reads the bytes
+                    # as the values they encode
+                    part = np.ascontiguousarray(chunk[rows], dtype=data_dtype).ravel()
+                    if located is None:
+                        if data_dtype.kind == "f" and np.isnan(part).any():
+                            # np.percentile returns NaN
+                            return dtype.type(np.nan), dtype.type(np.nan)
+                        count += part.size
+
+                    keys = keys_of(part)
+                    digits = ((keys >> shift) & 0xFFFF).astype(np.intp)
+                    for prefix in prefixes:
+                        selected = digits
+                        if prefix is not None:
+                            selected = digits[(keys >> (shift + 16)) == prefix]
+                        counts[prefix] += np.bincount(selected, minlength=1 << 16)
+
+            if located is None:
+                if count == 0:
+                    return cls.percentiles(np.empty(0, data_dtype), low, high, dtype)
+                located = {
+                    k: (None, k)
+                    for q in (low, high)
+                    for k in cls._positions(count, q)
+                }
+
+            for k, (prefix, rank) in located.items():
+                cumulative = np.cumsum(counts[prefix])
+                digit = int(np.searchsorted(cumulative, rank, side="right"))
+                rank -= int(cumulative[digit - 1]) if digit else 0
+                located[k] = (digit if prefix is None else (prefix << 16) | digit, rank)
+
+        return cls._interpolate(
+            count, low, high, dtype, lambda k: value_of(located[k][0])
+        )
+
+    @classmethod
+    def normalize(cls, data, p_low, p_high, out=None):
+        """
+        (data - p_low) / (p_high - p_low) clipped to [0, 1] (zeros when
+        p_high <= p_low). Pass out=data to stretch a float array in place.
+        """
+        if out is None:
+            out = np.empty(data.shape, np.result_type(data, p_low, p_high))
+
+        if not p_high > p_low:
+            out[...] = 0
+            return out
+
+        scale = p_high - p_low
+        for rows in cls.row_chunks(data):
+            chunk = out[rows]
+            np.subtract(data[rows], p_low, out=chunk)
+            np.divide(chunk, scale, out=chunk)
+            np.clip(chunk, 0, 1, out=chunk)
+        return out
+
+    @classmethod
+    def to_uint8(cls, data, p_low, p_high, out=None):
+        """
+        normalize() scaled to 0-255 and truncated to uint8.
+        """
+        if out is None:
+            out = np.empty(data.shape, np.uint8)
+
+        for rows in cls.row_chunks(data):
+            norm = cls.normalize(data[rows], p_low, p_high)
+            np.multiply(norm, 255, out=norm)
+            out[rows] = norm
+        return out
+
+    @classmethod
+    def row_chunks(cls, data):
+        """
+        Slices along the first axis of about CHUNK_PIXELS pixels each.
+        """
+        if data.ndim == 0 or data.size == 0:
+            yield Ellipsis
+            return
+
+        step = max(1, cls.CHUNK_PIXELS * len(data) // data.size)
+        for start in range(0, len(data), step):
+            yield slice(start, start + step)
+
+    @classmethod
+    def _histogram(cls, data):
+        """
+        (counts, offset): counts[i] pixels have value i + offset.
+        """
+        info = np.iinfo(data.dtype)
+        counts = np.zeros(int(info.max) - int(info.min) + 1, dtype=np.int64)
+        for rows in cls.row_chunks(data):
+            chunk = data[rows].ravel()
+            if info.min:
+                chunk = chunk.astype(np.int32) - int(info.min)
+            counts += np.bincount(chunk, minlength=len(counts))
+        return counts, int(info.min)
+
+    @classmethod
+    def _sample(cls, data):
+        """
+        data flattened (a copy), or every k-th pixel of it when float
+        data exceeds the sample limit.
+        """
+        limit = cls.sample_limit
+        if limit is None:
+            limit = int(os.environ.get(cls.ENV_SAMPLE_LIMIT) or 0)
+
+        if data.dtype.kind == "f" and 0 < limit < data.size:
+            stride = data.size // limit
+            if data.flags.c_contiguous:
+                return data.reshape(-1)[::stride].copy()
+            return data.flat[::stride]
+        return data.flatten()
+
+    @classmethod
+    def _from_histogram(cls, counts, offset, low, high, dtype):
+        cumulative = np.cumsum(counts)
+        return cls._interpolate(
+            int(cumulative[-1]),
+            low,
+            high,
+            dtype,
+            lambda k: np.searchsorted(cumulative, k, side="right") + offset,
+        )
+
+    @classmethod
+    def _interpolate(cls, count, low, high, dtype, values):
+        """
+        (low, high) percentiles from values(k), the value at sorted
+        position k of count values.
+        """
+        results = []
+        for q in (low, high):
+            previous, following, gamma = cls._positions(count, q, gamma=True)
+            a = dtype.type(values(previous))
+            b = dtype.type(values(following))
+            results.append(cls._lerp(a, b, gamma))
+        return tuple(results)
+
+    @staticmethod
+    def _partitioned(flat, positions):
+        """
+        Partition flat in place at positions and return a lookup of the
+        value at each sorted position, or None if flat contains NaN.
+        """
+        flat.partition(np.unique([0, flat.size - 1] + positions))
+        if flat.dtype.kind == "f" and np.isnan(flat[-1]):
+            return None
+        return lambda k: flat[k]
+
+    @staticmethod
+    def _positions(count, q, gamma=False):
+        """
+        Sorted positions around the q-th percentile of count values and
+        the interpolation weight, as np.percentile's linear method.
+        """
+        virtual = (count - 1) * np.true_divide(q, 100)
+        if virtual >= count - 1:
+            previous = following = count - 1
+        elif virtual < 0:
+            previous = following = 0
+        else:
+            previous = int(np.floor(virtual))
+            following = previous + 1
+        if not gamma:
+            return previous, following
+        return previous, following, float(virtual - np.floor(virtual))
+
+    @staticmethod
+    def _lerp(a, b, t):
+        # Same operation order as NumPy's percentile interpolation
+        diff = b - a
+        if t >= 0.5:
+            return b - diff * (1 - t)
+        return a + diff * t
@@ -0,0 +1,144 @@
+import math
+
+import cv2
+import numpy as np
+import tifffile
+from astropy.io import fits
+from PIL import Image
+
+
+class PreviewDecoder:
+    """
+    Reduced-resolution decodes for the GUI previews.
+
+    decode(path, width) returns a display-ready PIL image at least `width`
+    pixels wide (oversampled up to OVERSAMPLE x), reading only part of
+    the file. The full frame is never materialized:
+
+    - JPEG: libjpeg DCT scaling (1/2, 1/4 or 1/8) via Image.draft.
+    - FITS: every k-th row of the primary HDU, every k-th pixel of it.
+    - TIFF: the smallest sufficient pyramid level, or a strided view of
+      memory-mappable (uncompressed, contiguous) image data.
+
+    Returns None when the format has no proxy path (PNG, compressed
+    TIFF without pyramid levels, ...); callers then decode the full file.
+    """
+
+    # Proxy width relative to the requested width, so the final resize
+    # still averages over several source pixels
+    OVERSAMPLE = 2
+
+    @classmethod
+    def decode(cls, path, width):
+        lower = path.lower()
+        try:
+            if lower.endswith((".jpg", ".jpeg")):
+                return cls._decode_jpeg(path, width)
+            if lower.endswith((".fit", ".fits")):
+                return cls._decode_fits(path, width)
+            if lower.endswith((".tif", ".tiff")):
+                return cls._decode_tiff(path, width)
+        except Exception as e:
+            print(f"[PreviewDecoder] proxy decode failed for '{path}': {e}")
+        return None
+
+    @classmethod
+    def _stride(cls, full_width, width):
+        return max(1, full_width // (width * cls.OVERSAMPLE))
+
+    @classmethod
+    def _decode_jpeg(cls, path, width):
+        img = Image.open(path)
+        height = math.ceil(width * img.size[1] / img.size[0])
+        img.draft(img.mode, (width * cls.OVERSAMPLE, height * cls.OVERSAMPLE))
+        img.load()
+        return img
+
+    @classmethod
+    def _decode_fits(cls, path, width):
+        with fits.open(path, memmap=False) as hdul:
+            hdu = hdul[0]
+            shape = hdu.shape
+            if len(shape) != 2 and not (len(shape) == 3 and shape[0] == 3):
+                return None
+
+            step = cls._stride(shape[-1], width)
+            planes = [()] if len(shape) == 2 else [(c,) for c in range(shape[0])]
+            # One contiguous row read per kept row (sections with a step
+            # read pixel by pixel)
+            data = np.stack(
+                [
+                    np.stack(
+                        [
+                            hdu.section[plane + (row,)][::step]
+                            for row in range(0, shape[-2], step)
+                        ]
+                    )
+                    for plane in planes
+                ]
+            )
+
+        data = data.astype(np.float32)
+        if len(shape) == 2:
+            data = data[0]
+        else:
+            data = np.transpose(data, (1, 2, 0))
+        return Image.fromarray(cls._to_uint8(data))
+
+    @classmethod
+    def _decode_tiff(cls, path, width):
+        with tifffile.TiffFile(path) as tif:
+            series = tif.series[0]
+            axes = series.axes
+            if "X" not in axes or "Y" not in axes:
+                return None
+
+            # Smallest pyramid level still wide enough for the preview
+            levels = series.levels
+            level = 0
+            for index, candidate in enumerate(levels):
+                if candidate.shape[axes.index("X")] >= width * cls.OVERSAMPLE:
+                    level = index
+
+            if level > 0:
+                data = levels[level].asarray()
+            elif series.dataoffset is not None:
+                data = tifffile.memmap(path, series=0, level=0, mode="r")
+            else:
+                return None
+
+        # Strided selection: every k-th row and column, first index of
+        # any extra axes, samples last
+        step = cls._stride(data.shape[axes.index("X")], width)
+        selection = []
+        kept = []
+        for axis in axes:
+            if axis in "YX":
+                selection.append(slice(None, None, step))
+                kept.append(axis)
+            elif axis == "S":
+                selection.append(slice(None))
+                kept.append(axis)
+            else:
+                selection.append(0)
+        # Copy in native byte order (big-endian files map as e.g. >u2)
+        data = np.array(data[tuple(selection)], dtype=data.dtype.newbyteorder("="))
+        if "S" in kept:
+            data = np.moveaxis(data, kept.index("S"), -1)
+            if data.shape[-1] not in (3, 4):
+                data = data[..., 0]
+
+        if data.dtype.kind == "u" and data.dtype.itemsize == 2 and data.ndim == 3:
+            # PIL decodes 16-bit RGB(A) TIFFs to their high bytes
+            data = (data >> 8).astype(np.uint8)
+        elif data.dtype != np.uint8:
+            data = cls._to_uint8(data.astype(np.float32))
+        return Image.fromarray(data)
+
+    @staticmethod
+    def _to_uint8(data):
+        """
+        Min-max stretch to uint8 (as the full-resolution preview does).
+        """
+        data = cv2.normalize(data, None, 0, 255, cv2.NORM_MINMAX)
+        return data.astype(np.uint8)
@@ -0,0 +1,156 @@
+import numpy as np
+
+
+class SpatialGrid:
+    """
+    Uniform grid over 2D points for finding close pairs.
+
+    Points are bucketed into square cells of side cell_size and sorted by
+    cell (row-major), so the points of each cell are a single contiguous
+    slice. Close pairs cost one searchsorted per neighbouring cell offset
+    plus the points in those cells.
+    """
+
+    def __init__(self, x, y, cell_size):
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.cell_size = float(cell_size)
+
+        cx, cy = self._cell(self.x, self.y)
+        self._order = np.lexsort((cx, cy))
+        self._sorted_keys = self._key(cx[self._order], cy[self._order])
+
+    def __len__(self):
+        return len(self.x)
+
+    def pairs(self, radius):
+        """
+        All index pairs (i, j), i < j, closer than or at radius.
+        Requires radius <= cell_size (only adjacent cells are searched).
+        """
+        if radius > self.cell_size:
+            raise ValueError("radius must not exceed cell_size")
+
+        keys = self._sorted_keys
+        n = len(keys)
+        if n < 2:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty
+
+        cx = (keys & 0xFFFFFFFF) - (1 << 31)
+        cy = keys >> 32
+        first, second = [], []
+        # Each unordered cell pair once: same cell, then 4 forward neighbours
+        for dx, dy in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+            target = self._key(cx + dx, cy + dy)
+            lo = np.searchsorted(keys, target, side="left")
+            hi = np.searchsorted(keys, target, side="right")
+            if dx == 0 and dy == 0:
+                # Later points of the same cell only
+                lo = np.arange(1, n + 1)
+            counts = np.maximum(hi - lo, 0)
+            first.append(np.repeat(np.arange(n), counts))
+            second.append(self._ranges(lo, hi))
+
+        a = self._order[np.concatenate(first)]
+        b = self._order[np.concatenate(second)]
+        close = (self.x[a] - self.x[b]) ** 2 + (self.y[a] - self.y[b]) ** 2 <= (
+            radius * radius
+        )
+        a, b = a[close], b[close]
+        return np.minimum(a, b), np.maximum(a, b)
+
+    @staticmethod
+    def dedupe(x, y, radius, priority=None):
+        """
+        Boolean keep-mask that drops points within radius of a kept point.
+
+        Points are visited by descending priority (e.g. significance), so
+        of each cluster of duplicates the strongest survives. Only points
+        with a neighbour inside radius take part in the greedy pass.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        keep = np.ones(len(x), dtype=bool)
+        if len(x) < 2:
+            return keep
+
+        a, b = SpatialGrid(x, y, radius).pairs(radius)
+        if len(a) == 0:
+            return keep
+
+        if priority is None:
+            order = np.arange(len(x))
+        else:
+            order = np.argsort(-np.asarray(priority), kind="stable")
+        rank = np.empty(len(x), dtype=np.intp)
+        rank[order] = np.arange(len(x))
+
+        # Neighbour lists (CSR) of the points that have any
+        src = np.concatenate([a, b])
+        dst = np.concatenate([b, a])
+        by_src = np.argsort(src, kind="stable")
+        src, dst = src[by_src], dst[by_src]
+        involved, starts = np.unique(src, return_index=True)
+        ends = np.append(starts[1:], len(src))
+
+        for k in np.argsort(rank[involved], kind="stable").tolist():
+            i = involved[k]
+            if keep[i]:
+                # Drop the neighbours this kept point outranks
+                for j in dst[starts[k] : ends[k]].tolist():
+                    if rank[j] > rank[i]:
+                        keep[j] = False
+        return keep
+
+    @staticmethod
+    def match(x1, y1, x2, y2, radius):
+        """
+        One-to-one matching of two point sets within radius.
+
+        Returns (i, j, distance) arrays: point i of the first set matches
+        point j of the second. Closest pairs are matched first, and each
+        point is matched at most once.
+        """
+        n = len(x1)
+        x = np.concatenate([np.asarray(x1, np.float64), np.asarray(x2, np.float64)])
+        y = np.concatenate([np.asarray(y1, np.float64), np.asarray(y2, np.float64)])
+        a, b = SpatialGrid(x, y, radius).pairs(radius)
+
+        # Only pairs across the two sets (a < b, so a is in the first)
+        cross = (a < n) & (b >= n)
+        a, b = a[cross], b[cross] - n
+        distance = np.hypot(x[a] - x[b + n], y[a] - y[b + n])
+
+        order = np.argsort(distance, kind="stable")
+        used_first = np.zeros(n, dtype=bool)
+        used_second = np.zeros(len(x) - n, dtype=bool)
+        matched = []
+        for k in order.tolist():
+            i, j = a[k], b[k]
+            if not used_first[i] and not used_second[j]:
+                used_first[i] = used_second[j] = True
+                matched.append(k)
+
+        matched = np.asarray(matched, dtype=np.intp)
+        return a[matched], b[matched], distance[matched]
+
+    @staticmethod
+    def _ranges(lo, hi):
+        """
+        Concatenation of arange(lo[k], hi[k]) over all k (empty if hi <= lo).
+        """
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return offsets + np.repeat(lo, counts)
+
+    def _cell(self, x, y):
+        return np.floor_divide(x, self.cell_size), np.floor_divide(y, self.cell_size)
+
+    @staticmethod
+    def _key(cx, cy):
+        # Cells packed into one int64: row in the high 32 bits, column
+        # (offset to stay non-negative) in the low 32 bits
+        cx = np.asarray(cx, dtype=np.int64) + (1 << 31)
+        return (np.asarray(cy, dtype=np.int64) << 32) + cx
@@ -0,0 +1,123 @@
+import numpy as np
+import tifffile
+
+
+class TiffBandReader:
+    """
+    Lazy access to the first image series of a TIFF in bands along its
+    first axis (rows for YX / YXS images), as tifffile.imread would
+    return the whole array.
+
+    Only one band is decoded at a time:
+
+    - Uncompressed, contiguous data is memory-mapped and sliced.
+    - Compressed single-page images (striped or tiled, contiguous
+      samples) are decoded strip by strip / tile row by tile row.
+    - Any other layout (multi-page series, planar compressed samples,
+      ...) falls back to one full read, yielded as a single band.
+
+    bands() can be iterated any number of times; each pass re-reads the
+    file.
+    """
+
+    # Approximate pixels per band (rounded to whole strips / tile rows)
+    BAND_PIXELS = 1 << 22
+
+    def __init__(self, path):
+        self.path = path
+        with tifffile.TiffFile(path) as tif:
+            series = tif.series[0]
+            page = series.keyframe
+            self.shape = tuple(series.shape)
+            # Native byte order (as tifffile.imread returns)
+            self.dtype = np.dtype(series.dtype).newbyteorder("=")
+
+            if series.dataoffset is not None:
+                self.mode = "memmap"
+            elif (
+                len(series.pages) == 1
+                and page.shape == self.shape
+                and page.imagedepth == 1
+                and (page.samplesperpixel == 1 or page.planarconfig == 1)
+            ):
+                self.mode = "segments"
+            else:
+                self.mode = "full"
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def band_rows(self):
+        """
+        Rows (entries along the first axis) per band.
+        """
+        if not self.shape:
+            return 1
+        per_row = max(1, int(np.prod(self.shape[1:])))
+        return max(1, self.BAND_PIXELS // per_row)
+
+    def bands(self):
+        """
+        Yield (slice along axis 0, band array) covering the image in order.
+        Bands may be views of a read-only memory map; copy before
+        modifying.
+        """
+        if self.mode == "memmap":
+            data = tifffile.memmap(self.path, mode="r")
+            step = self.band_rows()
+            for start in range(0, len(data), step):
+                rows = slice(start, min(start + step, len(data)))
+                # Big-endian files map as e.g. >f4; bands are native order
+                yield rows, data[rows].astype(self.dtype, copy=False)
+        elif self.mode == "segments":
+            yield from self._segment_bands()
+        else:
+            data = tifffile.imread(self.path)
+            yield slice(0, len(data)), data
+
+    def _segment_bands(self):
+        with tifffile.TiffFile(self.path) as tif:
+            page = tif.series[0].pages[0]
+            # Normalized shape: (separate sample, depth, length, width,
+            # contig sample); separate sample and depth are 1 here
+            _, _, length, width, samples = page.shaped
+            segment_rows = page.tilelength if page.is_tiled else page.rowsperstrip
+            segment_rows = min(segment_rows, length)
+            rows_per_band = max(1, self.band_rows() // segment_rows) * segment_rows
+
+            # Read ahead about one band of file data (tifffile's default
+            # buffer is far larger)
+            band_bytes = rows_per_band * width * samples * self.dtype.itemsize
+
+            band = None
+            start = 0
+            for segment, index, _ in page.segments(buffersize=band_bytes):
+                y, x = index[2], index[3]
+                while y >= start + rows_per_band:
+                    if band is not None:
+                        yield self._finish(band, start, length)
+                        band = None
+                    start += rows_per_band
+                if band is None:
+                    band = np.full(
+                        (rows_per_band, width, samples), page.nodata, self.dtype
+                    )
+                if segment is None:
+                    continue
+
+                # Decoded tiles are full size; crop at the image edges
+                segment = segment[0]
+                rows = min(segment.shape[0], length - y)
+                cols = min(segment.shape[1], width - x)
+                band[y - start : y - start + rows, x : x + cols] = segment[
+                    :rows, :cols
+                ]
+
+            if band is not None:
+                yield self._finish(band, start, length)
+
+    def _finish(self, band, start, length):
+        stop = min(start + len(band), length)
+        band = band[: stop - start]
+        return slice(start, stop), band.reshape((stop - start,) + self.shape[1:])